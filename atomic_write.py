@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Writes files atomically, for the outputs of the tools and the cache of
+# md2rst. A file is written under a temporary name in its directory and
+# renamed when complete, so nobody can read a half-written file, and gets
+# the same permissions as a file created by open()
+
+import os
+import tempfile
+
+# The umask can only be read by setting it, so it's read once, before
+# any threads are started
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# Create a temporary file in the directory of path. Returns the file,
+# open with mode, and its name
+def create(path, mode='wb', encoding=None, newline=None):
+    # Errors, like a missing directory, are reported for path rather than
+    # the temporary file
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                   prefix="." + os.path.basename(path) + ".")
+    except OSError as e:
+        raise OSError(e.errno, e.strerror, path) from None
+    # The file descriptor is closed by fdopen() if it fails, e.g. with an
+    # unknown encoding
+    try:
+        return os.fdopen(fd, mode, encoding=encoding, newline=newline), tmp
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+# Move a temporary file made by create(), and closed, into place.
+# mkstemp creates files only readable by the owner
+def replace(tmp, path):
+    os.chmod(tmp, 0o666 & ~UMASK)
+    os.replace(tmp, path)
+
+# Write a text file by write(f), f being the open file
+def write(path, write, encoding='utf-8', newline=None):
+    f, tmp = create(path, 'w', encoding, newline)
+    try:
+        with f:
+            write(f)
+        replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def write_text(path, text):
+    write(path, lambda f: f.write(text))
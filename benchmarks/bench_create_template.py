@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Benchmarks create_template.py with and without --constant-memory.
+#
+# Runs create_template.py for each number of rows and return values, where
+# rows are the number of alarms and statuses and the return values are the
+# number of return values of each of them. Each run is a process of its
+# own, so its peak RSS is measured alone
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+CREATE_TEMPLATE = os.path.join(os.path.dirname(BENCHMARKS), "create_template.py")
+
+MODES = {
+    'default': [],
+    'constant-memory': ["--constant-memory"],
+}
+
+# Run create_template.py once, returning seconds, peak RSS in MiB and size
+def run(rows, rvs, mode, output):
+    command = [sys.executable, CREATE_TEMPLATE,
+               "--num-alarms", str(rows), "--alarm-rvs", str(rvs),
+               "--num-statuses", str(rows), "--status-rvs", str(rvs),
+               "--output", output] + MODES[mode]
+    start = time.perf_counter()
+    process = subprocess.Popen(command)
+    pid, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        print("Error: create_template.py failed: " + " ".join(command), file=sys.stderr)
+        sys.exit(1)
+
+    # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+    rss = usage.ru_maxrss * 1024
+    if sys.platform == 'darwin':
+        rss = usage.ru_maxrss
+    return {'seconds': seconds, 'peak_rss_mib': rss / (1024 * 1024),
+            'xlsx_bytes': os.path.getsize(output)}
+
+# Run a case a number of times, keeping the fastest time and lowest peak RSS
+def bench(rows, rvs, mode, repeat):
+    best = None
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "template.xlsx")
+        for i in range(repeat):
+            result = run(rows, rvs, mode, output)
+            if best is None:
+                best = result
+            best['seconds'] = min(best['seconds'], result['seconds'])
+            best['peak_rss_mib'] = min(best['peak_rss_mib'], result['peak_rss_mib'])
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark create_template.py with and ' +
+        'without --constant-memory')
+    parser.add_argument('--rows', type=int, action='append',
+        help='Number of alarms and statuses, may be given more than once ' +
+        '(default: 100, 1000, 10000)')
+    parser.add_argument('--rvs', type=int, action='append',
+        help='Number of return values of each alarm and status, may be given more ' +
+        'than once (default: 2, 26)')
+    parser.add_argument('--mode', action='append', choices=list(MODES),
+        help='Mode to run, may be given more than once (default: all)')
+    parser.add_argument('--repeat', type=int, default=1,
+        help='Number of runs of each case')
+    parser.add_argument('-o', '--output',
+        help='Write the results in json to file')
+    args = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': args.repeat,
+        'runs': []}
+    print("%-16s %7s %5s %10s %10s %12s" % ("Mode", "Rows", "RVs", "Time", "Peak RSS", "Size"))
+    for rows in args.rows or [100, 1000, 10000]:
+        for rvs in args.rvs or [2, 26]:
+            for mode in args.mode or MODES:
+                result = bench(rows, rvs, mode, args.repeat)
+                print("%-16s %7d %5d %9.2fs %7.1f MiB %12d" % (mode, rows, rvs,
+                      result['seconds'], result['peak_rss_mib'], result['xlsx_bytes']))
+                sys.stdout.flush()
+                result.update({'mode': mode, 'rows': rows, 'rvs': rvs})
+                results['runs'].append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(results, indent=2) + "\n")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Benchmarks the startup of yaml2rst.py.
+#
+# Runs yaml2rst.py in a new interpreter with -X importtime for each
+# scenario, and adds up the time spent importing modules. Each scenario is
+# run a number of times and the fastest run is kept. The exit status is
+# non-zero if the import time of any scenario is over its budget, so
+# modules that are slow to import, like pypandoc and yaml, aren't imported
+# again by code paths that don't need them
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+YAML2RST = os.path.join(os.path.dirname(BENCHMARKS), "yaml2rst.py")
+
+# Arguments of yaml2rst, if a small SXL is rendered from stdin, and the
+# budget of the import time in milliseconds of each scenario
+SCENARIOS = {
+    'help':   {'args': ["--help"], 'stdin': False, 'budget': 25},
+    'render': {'args': ["--no-cache"], 'stdin': True, 'budget': 50},
+}
+
+# A small SXL rendered by the render scenario
+def small_sxl():
+    import yaml
+    import generate_sxl
+    parser = argparse.ArgumentParser()
+    generate_sxl.add_arguments(parser)
+    options = parser.parse_args(["--object-types", "1", "--alarms", "1", "--statuses", "1",
+                                 "--commands", "1"])
+    return yaml.safe_dump(generate_sxl.generate(options), sort_keys=False,
+                          allow_unicode=True).encode('utf-8')
+
+# Imports from the output of -X importtime, as (module, cumulative
+# microseconds, nested), in the order they completed
+def parse_importtime(stderr):
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        imports.append((name.strip(), int(fields[1]), name.startswith("  ")))
+    return imports
+
+# Run yaml2rst once, returning the wall time and import time in
+# milliseconds and the slowest top-level imports
+def run(scenario, stdin):
+    command = [sys.executable, "-X", "importtime", YAML2RST] + SCENARIOS[scenario]['args']
+    start = time.perf_counter()
+    process = subprocess.run(command, input=stdin, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE)
+    seconds = time.perf_counter() - start
+    if process.returncode:
+        print(process.stderr.decode('utf-8', 'replace'), end="", file=sys.stderr)
+        print("Error: yaml2rst.py failed: " + " ".join(command), file=sys.stderr)
+        sys.exit(1)
+
+    imports = parse_importtime(process.stderr.decode('utf-8', 'replace'))
+    top = [(name, us) for name,us,nested in imports if not nested]
+    slowest = sorted(top, key=lambda item: item[1], reverse=True)
+    return {'wall_ms': seconds * 1000,
+            'import_ms': sum(us for name,us in top) / 1000,
+            'modules': len(imports),
+            'slowest': [{'module': name, 'ms': us / 1000} for name,us in slowest[:5]]}
+
+# Run a scenario a number of times, keeping the run with the lowest import
+# time and the lowest wall time
+def bench(scenario, repeat, stdin):
+    best = None
+    wall = None
+    for i in range(repeat):
+        result = run(scenario, stdin)
+        if best is None or result['import_ms'] < best['import_ms']:
+            best = result
+        if wall is None or result['wall_ms'] < wall:
+            wall = result['wall_ms']
+    best['wall_ms'] = wall
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the startup of yaml2rst.py, ' +
+        'failing if the time spent importing modules is over budget')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+        help='Scenario to run, may be given more than once (default: all)')
+    parser.add_argument('--repeat', type=int, default=5,
+        help='Number of runs of each scenario')
+    parser.add_argument('--budget', type=float, metavar='MS',
+        help='Budget of the import time of each scenario in milliseconds ' +
+        '(default: ' + ", ".join(name + " " + str(scenario['budget']) + " ms"
+                                 for name,scenario in SCENARIOS.items()) + ')')
+    parser.add_argument('-o', '--output',
+        help='Write the results in json to file')
+    args = parser.parse_args()
+
+    stdin = None
+    scenarios = args.scenario or list(SCENARIOS)
+    if any(SCENARIOS[name]['stdin'] for name in scenarios):
+        stdin = small_sxl()
+
+    # The first run compiles the modules, so it's not counted
+    for name in scenarios:
+        run(name, stdin if SCENARIOS[name]['stdin'] else None)
+
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': args.repeat,
+        'runs': []}
+    over = []
+    print("%-10s %10s %10s %10s %8s  %s" % ("Scenario", "Imports", "Budget", "Wall",
+                                            "Modules", "Slowest"))
+    for name in scenarios:
+        budget = SCENARIOS[name]['budget'] if args.budget is None else args.budget
+        result = bench(name, args.repeat, stdin if SCENARIOS[name]['stdin'] else None)
+        slowest = ", ".join("%s %.1fms" % (item['module'], item['ms'])
+                            for item in result['slowest'][:3])
+        print("%-10s %8.1fms %8.1fms %8.1fms %8d  %s" % (name, result['import_ms'], budget,
+              result['wall_ms'], result['modules'], slowest))
+        sys.stdout.flush()
+        result.update({'scenario': name, 'budget_ms': budget})
+        results['runs'].append(result)
+        if result['import_ms'] > budget:
+            over.append("%s (%.1f ms, budget %.1f ms)" % (name, result['import_ms'], budget))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(results, indent=2) + "\n")
+
+    if over:
+        print("Error: startup over budget: " + ", ".join(over), file=sys.stderr)
+        sys.exit(1)
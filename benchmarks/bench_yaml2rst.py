@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Benchmarks yaml2rst on synthetic SXLs of different sizes.
+#
+# Times each phase: loading the yaml, converting the descriptions,
+# rendering the document and writing the output. Each scenario is run a
+# number of times and the fastest time of each phase is kept. The results
+# are compared with a stored baseline, and the exit status is non-zero if
+# any phase is slower than the baseline by more than the tolerance
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import yaml
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+
+import generate_sxl
+import yaml2rst
+
+PHASES = ["load", "convert", "render", "output"]
+
+# Options of generate_sxl for each scenario
+SCENARIOS = {
+    'tlc':               {},
+    'large':             {'object_types': 12, 'alarms': 20, 'statuses': 30, 'commands': 20},
+    'many-arguments':    {'arguments': 12, 'enum_size': 16, 'array_items': 8},
+    'long-descriptions': {'description_length': 400},
+}
+
+def scenario_options(name):
+    parser = argparse.ArgumentParser()
+    generate_sxl.add_arguments(parser)
+    options = parser.parse_args([])
+    for option, value in SCENARIOS[name].items():
+        setattr(options, option, value)
+    return options
+
+# Run yaml2rst on the SXL in text once, returning the time of each phase
+def run(text, output, pandoc_only):
+    session = yaml2rst.Session(pandoc_only=pandoc_only)
+    times = {}
+
+    start = time.perf_counter()
+    rendering = yaml2rst.Rendering(session, yaml2rst.read_sxl(text), extended=True)
+    times['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    session.converter.prefetch(yaml2rst.collect_descriptions(rendering))
+    times['convert'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    document = yaml2rst.render_document(rendering)
+    times['render'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    out = yaml2rst.Writer(output)
+    document.write(out)
+    out.close()
+    times['output'] = time.perf_counter() - start
+    return times
+
+# Run a scenario a number of times, keeping the fastest time of each phase
+def bench(name, repeat, pandoc_only):
+    text = yaml.safe_dump(generate_sxl.generate(scenario_options(name)),
+                          sort_keys=False, allow_unicode=True)
+    best = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, name + ".rst")
+        for i in range(repeat):
+            for phase, seconds in run(text, output, pandoc_only).items():
+                best[phase] = min(best.get(phase, seconds), seconds)
+        size = os.path.getsize(output)
+    best['total'] = sum(best[phase] for phase in PHASES)
+    return {'yaml_bytes': len(text.encode('utf-8')), 'rst_bytes': size, 'seconds': best}
+
+# Compare results with a baseline. Returns the list of regressions
+def compare(results, baseline, tolerance, min_delta):
+    regressions = []
+    print("%-20s %-8s %10s %10s %8s" % ("Scenario", "Phase", "Baseline", "Current", "Change"))
+    for name, result in results['scenarios'].items():
+        if name not in baseline['scenarios']:
+            continue
+        for phase, seconds in result['seconds'].items():
+            before = baseline['scenarios'][name]['seconds'].get(phase)
+            if not before:
+                continue
+            change = (seconds - before) / before
+            regression = change > tolerance and seconds - before > min_delta
+            print("%-20s %-8s %9.1fms %9.1fms %+7.0f%%%s" % (name, phase, before*1000,
+                  seconds*1000, change*100, "  REGRESSION" if regression else ""))
+            if regression:
+                regressions.append(name + " " + phase)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark yaml2rst on synthetic SXLs')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+        help='Scenario to run, may be given more than once (default: all)')
+    parser.add_argument('--repeat', type=int, default=3,
+        help='Number of runs of each scenario')
+    parser.add_argument('--pandoc-only', action='store_true',
+        help='Convert all descriptions with pandoc, not the built-in converter')
+    parser.add_argument('-o', '--output',
+        help='Write the results in json to file')
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARKS, "baseline.json"),
+        help='Results to compare with (default: benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true',
+        help='Store the results as the new baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+        help='Allowed slowdown of a phase compared to the baseline (default: 0.25)')
+    parser.add_argument('--min-delta', type=float, default=0.005,
+        help='Slowdowns below this many seconds are never regressions (default: 0.005)')
+    args = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'libyaml': bool(yaml.__with_libyaml__),
+        'pandoc_only': args.pandoc_only,
+        'repeat': args.repeat,
+        'scenarios': {}}
+    for name in args.scenario or SCENARIOS:
+        results['scenarios'][name] = bench(name, args.repeat, args.pandoc_only)
+
+    report = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print("Baseline written to " + args.baseline)
+        sys.exit(0)
+
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except OSError:
+        print("Warning: no baseline in " + args.baseline + ", use --save-baseline to create it",
+              file=sys.stderr)
+        if not args.output:
+            print(report, end="")
+        sys.exit(0)
+
+    if baseline.get('pandoc_only') != args.pandoc_only:
+        print("Warning: the baseline was not run with the same --pandoc-only", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    if regressions:
+        print("Error: slower than the baseline: " + ", ".join(regressions), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Generates a synthetic SXL in yaml format, for benchmarking.
+# Uses the same header as the SXLs in tlc/ and the same structure of
+# object types, alarms, statuses and commands as the SXLs of rsmp_schema,
+# scaled by the options
+
+import sys
+import random
+import argparse
+import yaml
+
+WORDS = """
+signal group detector logic controller traffic light output input status
+command alarm cycle time plan program mode state request value current
+priority lamp fault door sensor power supply position red green yellow
+dark flash local remote manual automatic sequence interval offset clock
+""".split()
+
+# A sentence of random words
+def sentence(rnd, length):
+    words = [rnd.choice(WORDS) for i in range(max(1, length))]
+    return " ".join(words).capitalize() + "."
+
+# A description of about length words in markdown.
+# Longer descriptions get a second paragraph with inline markup and a list
+def description(rnd, length):
+    lines = [sentence(rnd, min(length, 6))]
+    length -= 6
+    if length > 0:
+        words = [rnd.choice(WORDS) for i in range(length)]
+        words[0] = "*" + words[0] + "*"
+        if length > 2:
+            words[2] = "`" + words[2] + "`"
+        lines += ["", " ".join(words).capitalize() + "."]
+    if length > 20:
+        lines += [""] + ["- " + sentence(rnd, 4) for i in range(3)]
+    return "\n".join(lines)
+
+def argument(rnd, index, options):
+    kind = index % 4
+    arg = {}
+    if kind == 0:
+        arg['type'] = "integer"
+        arg['description'] = description(rnd, 8)
+        arg['min'] = 0
+        arg['max'] = rnd.randint(1, 65535)
+    elif kind == 1:
+        arg['type'] = "string"
+        arg['description'] = description(rnd, 8)
+        arg['values'] = {"value" + str(i): sentence(rnd, 3)
+                         for i in range(options.enum_size)}
+    elif kind == 2:
+        arg['type'] = "boolean"
+        arg['description'] = description(rnd, 8)
+        arg['optional'] = True
+    else:
+        arg['type'] = "array"
+        arg['description'] = description(rnd, 8)
+        arg['items'] = {"item" + str(i): {
+                            'type': "integer",
+                            'description': sentence(rnd, 5),
+                            'min': 0, 'max': 255}
+                        for i in range(options.array_items)}
+    return arg
+
+def arguments(rnd, options):
+    return {"arg" + str(i): argument(rnd, i, options) for i in range(options.arguments)}
+
+# Generate an SXL as a yaml tree
+def generate(options):
+    rnd = random.Random(options.seed)
+    sxl = {
+        'id': "Plant id",
+        'version': "1.3.0",
+        'date': "2025-01-01",
+        'description': "Plant name",
+        'constructor': "RSMP Nordic",
+        'created-date': "2010-04-20",
+        'rsmp-version': "3.2",
+        'objects': {}
+    }
+
+    alarm_id = status_id = command_id = 0
+    for o in range(options.object_types):
+        object = {'description': sentence(rnd, 4)}
+        if o == 0:
+            object['aggregated_status'] = {
+                i: {'title': sentence(rnd, 3), 'description': sentence(rnd, 8)}
+                for i in range(1, 9)}
+            object['functional_position'] = None
+            object['functional_state'] = None
+
+        object['alarms'] = {}
+        for i in range(options.alarms):
+            alarm_id += 1
+            object['alarms']["A%04d" % alarm_id] = {
+                'description': description(rnd, options.description_length),
+                'priority': rnd.randint(1, 3),
+                'category': rnd.choice("DT"),
+                'from_version': "1.0.7",
+                'arguments': arguments(rnd, options)}
+
+        object['statuses'] = {}
+        for i in range(options.statuses):
+            status_id += 1
+            object['statuses']["S%04d" % status_id] = {
+                'description': description(rnd, options.description_length),
+                'from_version': "1.0.7",
+                'arguments': arguments(rnd, options)}
+
+        object['commands'] = {}
+        for i in range(options.commands):
+            command_id += 1
+            object['commands']["M%04d" % command_id] = {
+                'description': description(rnd, options.description_length),
+                'command': "set" + rnd.choice(WORDS).capitalize(),
+                'from_version': "1.0.7",
+                'arguments': arguments(rnd, options)}
+
+        sxl['objects']["Object type " + str(o + 1)] = object
+    return sxl
+
+def add_arguments(parser):
+    parser.add_argument('--object-types', type=int, default=8)
+    parser.add_argument('--alarms', type=int, default=5, help='Alarms per object type')
+    parser.add_argument('--statuses', type=int, default=8, help='Statuses per object type')
+    parser.add_argument('--commands', type=int, default=6, help='Commands per object type')
+    parser.add_argument('--arguments', type=int, default=2, help='Arguments per code')
+    parser.add_argument('--enum-size', type=int, default=4, help='Values per enum')
+    parser.add_argument('--array-items', type=int, default=3, help='Items per array')
+    parser.add_argument('--description-length', type=int, default=40,
+        help='Words per description')
+    parser.add_argument('--seed', type=int, default=1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic SXL in yaml format')
+    add_arguments(parser)
+    args = parser.parse_args()
+    yaml.safe_dump(generate(args), sys.stdout, sort_keys=False, allow_unicode=True)
@@ -2,7 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import xlsxwriter
+from xlsxwriter.utility import xl_cell_to_rowcol
 import argparse
+import datetime
+import sys
 
 parser = argparse.ArgumentParser(description='Create SXL template')
 parser.add_argument('--num-grouped-objects', default=15, type=int,
@@ -32,9 +35,240 @@ parser.add_argument('--ver', default='3.2', type=str,
 parser.add_argument('--output',
     default='RSMP_Template_SignalExchangeList.xlsx',
     help='Output filename')
+parser.add_argument('--constant-memory', action='store_true',
+    help='Write each row to disk when it is complete, so memory does not grow ' +
+    'with the number of rows and return values')
+parser.add_argument('--sxl', metavar='YAML',
+    help='Fill the template with the SXL in YAML format. The number of rows, ' +
+    'return values and arguments are taken from the SXL, not the options above')
+parser.add_argument('--site', metavar='YAML',
+    help='Fill the Version and Objects sheets with the site configuration, ' +
+    'one Objects sheet for each site. Needs --sxl')
+parser.add_argument('--short-desc', action='store_true',
+    help='Only the first line of the descriptions of alarms, statuses and commands')
 args = parser.parse_args()
 
-workbook = xlsxwriter.Workbook(args.output)
+if args.site and not args.sxl:
+    parser.error("--site needs --sxl")
+
+# The SXL and site configuration to fill the template with
+sxl = None
+site = None
+if args.sxl:
+    import sxl_yaml
+    try:
+        sxl = sxl_yaml.load_file(args.sxl)
+        if args.site:
+            site = sxl_yaml.load_file(args.site)
+    except (OSError, sxl_yaml.yaml.YAMLError) as e:
+        print("Error: " + str(e), file=sys.stderr)
+        sys.exit(1)
+
+# Value of a cell. Booleans and dates are written as in yaml
+def cell_value(value):
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+def reserved(code):
+    return code.get('reserved') is True
+
+def code_description(code):
+    if reserved(code):
+        return "Reserved"
+    description = code.get('description')
+    if description is not None and args.short_desc:
+        description = description.split("\n")[0]
+    return description
+
+# Type, value and comment of an argument or return value, like yaml2xlsx.
+# Enum values are listed as "-value" lines, with their descriptions added
+# to the comment as "value: description" lines
+def argument_cells(argument, reserved):
+    arg_type = argument['type'].replace("_list", "")
+    comment = argument.get('description')
+    values = None
+    if arg_type == "boolean":
+        values = "-False\n-True"
+    elif arg_type == "base64":
+        values = "[base64]"
+    elif arg_type == "array":
+        if argument.get('items'):
+            values = sxl_yaml.yaml.safe_dump(argument['items'], sort_keys=False,
+                                             allow_unicode=True, explicit_start=True)
+    else:
+        values = ""
+        enum = argument.get('values')
+        if enum is not None:
+            if type(enum) is list:
+                enum = dict.fromkeys(enum)
+            values = "\n".join("-" + str(cell_value(value)) for value in enum)
+            descriptions = [str(cell_value(value)) + ": " + str(description)
+                            for value,description in enum.items() if description is not None]
+            if descriptions:
+                comment = "\n".join(([comment] if comment is not None else []) + descriptions)
+        elif arg_type == "string":
+            values = "[string]"
+        elif argument.get('min') is not None:
+            values = "[" + str(argument['min']) + "-" + str(cell_value(argument.get('max')) or "") + "]"
+
+    if argument.get('optional'):
+        comment = "(Optional) " + (comment or "")
+    if argument.get('deprecated'):
+        comment = "(Deprecated) " + (comment or "")
+    if reserved:
+        comment = "Reserved"
+    return [arg_type, values, comment]
+
+# Alarms, statuses or commands of all object types as
+# (object type, code id, code), sorted by code id
+def codes(code_type):
+    items = [(name, code_id, code) for name,object in sxl['objects'].items()
+             for code_id,code in (object.get(code_type) or {}).items()]
+    return sorted(items, key=lambda item: str(item[1]))
+
+# Largest number of arguments of the codes
+def max_arguments(items):
+    return max([len(code.get('arguments') or {}) for name,code_id,code in items] + [0])
+
+def alarm_cells(item):
+    name, alarm_id, alarm = item
+    cells = [name, alarm.get('object'), alarm_id, code_description(alarm),
+             alarm.get('externalAlarmCodeId'), alarm.get('externalNtsAlarmCodeId'),
+             alarm.get('priority'), alarm.get('category')]
+    for arg_name, argument in (alarm.get('arguments') or {}).items():
+        cells += [arg_name] + argument_cells(argument, reserved(alarm))
+    return [cell_value(cell) for cell in cells]
+
+def status_cells(item):
+    name, status_id, status = item
+    cells = [name, status.get('object'), status_id, code_description(status)]
+    for arg_name, argument in (status.get('arguments') or {}).items():
+        cells += [arg_name] + argument_cells(argument, reserved(status))
+    return [cell_value(cell) for cell in cells]
+
+def command_cells(item):
+    name, command_id, command = item
+    cells = [name, command.get('object'), command_id, code_description(command)]
+    for arg_name, argument in (command.get('arguments') or {}).items():
+        cells += [arg_name, command.get('command')] + argument_cells(argument, reserved(command))
+    return [cell_value(cell) for cell in cells]
+
+def grouped(name):
+    return (sxl['objects'].get(name) or {}).get('aggregated_status') is not None
+
+def object_type_cells(item):
+    name, object = item
+    return [name, object.get('description')]
+
+def object_cells(item):
+    name, object_name, object = item
+    if object is None:
+        print("Warning: componentId is missing for " + str(object_name), file=sys.stderr)
+        return [name, object_name]
+    return [cell_value(cell) for cell in [name, object_name, object.get('componentId'),
+            object.get('ntsObjectId'), object.get('externalNtsId'), object.get('description')]]
+
+def aggregated_status_cells(item):
+    name, object = item
+    positions = [None, None]
+    for i, key in enumerate(['functional_position', 'functional_state']):
+        if object.get(key) is not None:
+            positions[i] = "\n".join("-" + str(position) for position in object[key])
+    state = None
+    if item is grouped_types[0]:
+        state = 'See state-bit definitions below'
+    return [name, state] + positions + [object.get('aggregated_status_description')]
+
+# The sizes of the sections are taken from the SXL. All commands are
+# parameters, since the yaml doesn't tell the types of commands apart
+if sxl:
+    grouped_types = [(name, object) for name,object in sxl['objects'].items() if grouped(name)]
+    single_types = [(name, object) for name,object in sxl['objects'].items() if not grouped(name)]
+    alarms = codes('alarms')
+    statuses = codes('statuses')
+    commands = codes('commands')
+    args.alarm_rvs = max_arguments(alarms)
+    args.status_rvs = max_arguments(statuses)
+    args.command_args = max_arguments(commands)
+    args.num_command_functional_position = 0
+    args.num_command_functional_state = 0
+    args.num_command_maneuver = 0
+    if len(grouped_types) > 8:
+        print("Error: at most 8 grouped object types fit in the Aggregated status sheet",
+              file=sys.stderr)
+        sys.exit(1)
+    info = site or sxl
+
+workbook = xlsxwriter.Workbook(args.output, {'constant_memory': args.constant_memory})
+
+# A worksheet written in row order when the workbook is closed, which
+# constant memory mode requires. Ranges of empty boxed cells are kept as
+# ranges until then and written a row at a time, so they take no memory
+# before the row is written, and none after in constant memory mode.
+# The empty cells are still written, since xlsx2yaml reads them.
+# Rows filled from the SXL are also made when they are written
+class Sheet:
+    def __init__(self, name):
+        self.worksheet = workbook.add_worksheet(name)
+        self.cells = {}
+        self.merges = {}
+        self.boxes = []
+        self.data = []
+        sheets.append(self)
+
+    # Write to a cell given as e.g. 'B2', or as row and column
+    def write(self, *args):
+        if type(args[0]) is str:
+            args = xl_cell_to_rowcol(args[0]) + args[1:]
+        row, col, value, format = args
+        self.cells.setdefault(row, {})[col] = (value, format)
+
+    def merge_range(self, first_row, first_col, last_row, last_col, value, format):
+        self.merges[first_row] = self.merges.get(first_row, []) + [
+            (first_row, first_col, last_row, last_col, value, format)]
+
+    # Empty cells with a box, from first_row to before end_row
+    def box(self, first_row, end_row, first_col, last_col):
+        if end_row > first_row:
+            self.boxes.append((first_row, end_row, first_col, last_col))
+
+    # Boxed rows from first_row with the cells made by cells(item) for each
+    # of items, from the first column to last_col. Empty cells are None or "".
+    # The rows are followed by an empty boxed row, where xlsx2yaml stops
+    def rows(self, first_row, items, cells, last_col):
+        self.data.append((first_row, first_row + len(items), items, cells))
+        self.box(first_row, first_row + len(items) + 1, 0, last_col)
+
+    def write_comment(self, cell, comment):
+        self.worksheet.write_comment(cell, comment)
+
+    def set_column(self, first_col, last_col, width):
+        self.worksheet.set_column(first_col, last_col, width)
+
+    def close(self):
+        rows = set(self.cells) | set(self.merges)
+        end = max([end_row for first_row,end_row,first_col,last_col in self.boxes] +
+                  [row + 1 for row in rows] + [0])
+        for row in range(end):
+            for first_row, end_row, first_col, last_col in self.boxes:
+                if first_row <= row < end_row:
+                    self.worksheet.write_row(row, first_col, [""] * (last_col - first_col + 1), t9_box)
+            for first_row, end_row, items, cells in self.data:
+                if first_row <= row < end_row:
+                    for col, value in enumerate(cells(items[row - first_row])):
+                        if value is not None and value != "":
+                            self.worksheet.write(row, col, value, t9_box_wrap)
+            if row not in rows:
+                continue
+            for merge in self.merges.get(row, []):
+                self.worksheet.merge_range(*merge)
+            for col, (value, format) in sorted(self.cells.get(row, {}).items()):
+                self.worksheet.write(row, col, value, format)
+
+sheets = []
 
 # Formatting
 t32b_c = workbook.add_format({'font_name':'Arial', 'font_size':'32',
@@ -64,28 +298,37 @@ t9_c_box = workbook.add_format({'font_name':'Arial', 'font_size':'9',
     'bold':False, 'align':'center', 'border':1})
 t9_box = workbook.add_format({'font_name':'Arial', 'font_size':'9',
     'bold':False, 'border':1})
+t9_box_wrap = workbook.add_format({'font_name':'Arial', 'font_size':'9',
+    'bold':False, 'border':1, 'text_wrap':True})
+
+# Value of the Version sheet from the site configuration, or the SXL
+# without one. The text of the template if not given
+def version(key, default):
+    if sxl and info.get(key) is not None:
+        return cell_value(info[key])
+    return default
 
 # Version
-worksheet = workbook.add_worksheet('Version')
+worksheet = Sheet('Version')
 worksheet.write('B2', 'Signal Exchange List', t18b_c)
-worksheet.write('B4', 'Plant id', t32b_c)
-worksheet.write('B6', 'Plant name', t18b_c)
+worksheet.write('B4', version('id', 'Plant id'), t32b_c)
+worksheet.write('B6', version('description', 'Plant name'), t18b_c)
 worksheet.write('B8', 'Work documentation', t18b_c)
 worksheet.write('A10', 'Constructor:', t9b_r)
-worksheet.write('B10', '', t9_box)
+worksheet.write('B10', version('constructor', ''), t9_box)
 worksheet.write('A12', 'Reviewed:', t9b_r)
-worksheet.write('B12', '', t9_box)
+worksheet.write('B12', version('reviewed', ''), t9_box)
 worksheet.write('B13', '', t9_box)
 worksheet.write('A15', 'Approved:', t9b_r)
-worksheet.write('B15', '', t9_box)
+worksheet.write('B15', version('approved', ''), t9_box)
 worksheet.write('B16', '', t9_box)
 worksheet.write('A18', 'Created date:', t9b_r)
-worksheet.write('B18', 'yyyy-mm-dd', t9_c_box)
+worksheet.write('B18', version('created-date', 'yyyy-mm-dd'), t9_c_box)
 worksheet.write('A20', 'SXL revision:', t9b_r)
 worksheet.write('B20', 'Revision number', t9b_c_box)
 worksheet.write('C20', 'Revision date', t9b_c_box)
-worksheet.write('B21', '1.0', t9_c_box)
-worksheet.write('C21', 'yyyy-mm-dd', t9_c_box)
+worksheet.write('B21', version('version', '1.0'), t9_c_box)
+worksheet.write('C21', version('date', 'yyyy-mm-dd'), t9_c_box)
 worksheet.write('B22', '', t9_box)
 worksheet.write('C22', '', t9_box)
 worksheet.write('B23', '', t9_box)
@@ -93,7 +336,7 @@ worksheet.write('C23', '', t9_box)
 worksheet.write('B24', '', t9_box)
 worksheet.write('C24', '', t9_box)
 worksheet.write('A26', 'RSMP version:', t9b_r)
-worksheet.write('B26', args.ver, t9_c_box)
+worksheet.write('B26', version('rsmp-version', args.ver), t9_c_box)
 
 # Write comments
 worksheet.write_comment('B2',
@@ -116,22 +359,26 @@ worksheet.set_column(1, 1, 30.63)
 worksheet.set_column(2, 2, 18.63)
 
 # Object types
-worksheet = workbook.add_worksheet('Object types')
+worksheet = Sheet('Object types')
 worksheet.write('A1', 'Object types', t18b)
 worksheet.write('A3', 'Revision date:', t9b_r)
 worksheet.write('B3', 'yyyy-mm-dd', t9_c)
 worksheet.write('A5', 'Grouped object types', t9b_l)
 worksheet.write('A6', 'ObjectType', t9b_l_i_box)
 worksheet.write('B6', 'Description/comment', t9b_l_i_box)
-for col in range(0,2):
-    for row in range(6,14):
-        worksheet.write(row, col, "", t9_box)
-worksheet.write('A17', 'Single object types', t9b_l)
-worksheet.write('A18', 'ObjectType', t9b_l_i_box)
-worksheet.write('B18', 'Description/comment', t9b_l_i_box)
-for col in range(0,2):
-    for row in range(18,26):
-        worksheet.write(row, col, "", t9_box)
+st_row = 16 # title of single object types
+if sxl:
+    worksheet.rows(6, grouped_types, object_type_cells, 1)
+    st_row = 6 + len(grouped_types) + 3
+else:
+    worksheet.box(6, 14, 0, 1)
+worksheet.write(st_row, 0, 'Single object types', t9b_l)
+worksheet.write(st_row+1, 0, 'ObjectType', t9b_l_i_box)
+worksheet.write(st_row+1, 1, 'Description/comment', t9b_l_i_box)
+if sxl:
+    worksheet.rows(st_row+2, single_types, object_type_cells, 1)
+else:
+    worksheet.box(18, 26, 0, 1)
 
 # Write comments
 worksheet.write_comment('A1',
@@ -144,63 +391,89 @@ worksheet.set_column(0, 0, 32.13)
 worksheet.set_column(1, 1, 38.75)
 worksheet.set_column(2, 2, 41.25)
 
-# Objects
-worksheet = workbook.add_worksheet('Objects')
-worksheet.write('A1', 'Site objects', t18b)
-worksheet.write('A2', 'Siteid:', t9b_r)
-worksheet.write('B2', 'siteid', t18_c_i)
-worksheet.write('C2', 'description', t18_i)
-worksheet.write('A3', 'Revision date:', t9b_r)
-worksheet.write('B3', 'yyyy-mm-dd', t9_c)
-worksheet.write('A5', 'Grouped objects', t9b_l)
-worksheet.write('A6', 'ObjectType', t9b_l_i_box)
-worksheet.write('B6', 'Object', t9b_l_i_box)
-worksheet.write('C6', 'componentId', t9b_l_i_box)
-worksheet.write('D6', 'NTSObjectId', t9b_l_i_box)
-worksheet.write('E6', 'externalNtsId', t9b_l_i_box)
-worksheet.write('F6', 'Description', t9b_l_i_box)
-
-go_row=6 # start row
-for col in range(0,6):
-    for row in range(go_row,go_row+args.num_grouped_objects):
-        worksheet.write(row, col, "", t9_box)
-
-so_row=go_row+args.num_grouped_objects # start row
-
-worksheet.write(so_row, 0, 'Single objects', t9b_l)
-worksheet.write(so_row+1, 0, 'ObjectType', t9b_l_i_box)
-worksheet.write(so_row+1, 1, 'Object', t9b_l_i_box)
-worksheet.write(so_row+1, 2, 'componentId', t9b_l_i_box)
-worksheet.write(so_row+1, 3, 'NTSObjectId', t9b_l_i_box)
-worksheet.write(so_row+1, 4, 'externalNtsId', t9b_l_i_box)
-worksheet.write(so_row+1, 5, 'Description', t9b_l_i_box)
-
-for col in range(0,6):
-    for row in range(so_row+2,so_row+2+args.num_single_objects):
-        worksheet.write(row, col, "", t9_box)
-
-# Write comments
-worksheet.write_comment('A1',
-  "This tab contains info about all grouped objects and their single objects."+
-  "This tab should be exported to RSMP Simulators(s) as a CSV file, \n"+
-  "preferred name ''SiteId.CSV'', ex ''AB_26507_881.CSV''."+
-  "If there are multiple SiteId's for one plant (ex congestion tax) \n"+
-  "just add more Objects tabs and export them as multiple CSV files.")
-worksheet.write_comment('B2',
-  "SiteId(s) are always sent in the first RSMP packet.\n"+
-  "The communication partners could/should use this information to validate\n"+
-  "they actually are communicating with the correct plant.")
-
-# Adjust widths
-worksheet.set_column(0, 0, 32)    # Object types
-worksheet.set_column(1, 1, 34.4)  # Object
-worksheet.set_column(2, 2, 25)    # componentId
-worksheet.set_column(3, 3, 27.2)  # NTSObjectId
-worksheet.set_column(4, 4, 27.2)  # externalNtsId
-worksheet.set_column(5, 5, 57.4)  # Description
+# Objects, one sheet for each site of the site configuration
+object_sheets = [('Objects', 'siteid', 'description', None)]
+if site and site.get('sites'):
+    object_sheets = []
+    for site_id, site_info in site['sites'].items():
+        site_info = site_info or {}
+        name = 'Objects'
+        if object_sheets:
+            name = 'Objects ' + str(len(object_sheets) + 1)
+        # Site configurations of SXL 1.3 have components, older ones objects
+        site_objects = site_info.get('components') or site_info.get('objects') or {}
+        object_sheets.append((name, cell_value(site_id), site_info.get('description'),
+                              site_objects))
+
+for sheet_name, site_id, site_description, site_objects in object_sheets:
+    worksheet = Sheet(sheet_name)
+    worksheet.write('A1', 'Site objects', t18b)
+    worksheet.write('A2', 'Siteid:', t9b_r)
+    worksheet.write('B2', site_id, t18_c_i)
+    worksheet.write('C2', site_description, t18_i)
+    worksheet.write('A3', 'Revision date:', t9b_r)
+    worksheet.write('B3', 'yyyy-mm-dd', t9_c)
+    worksheet.write('A5', 'Grouped objects', t9b_l)
+    worksheet.write('A6', 'ObjectType', t9b_l_i_box)
+    worksheet.write('B6', 'Object', t9b_l_i_box)
+    worksheet.write('C6', 'componentId', t9b_l_i_box)
+    worksheet.write('D6', 'NTSObjectId', t9b_l_i_box)
+    worksheet.write('E6', 'externalNtsId', t9b_l_i_box)
+    worksheet.write('F6', 'Description', t9b_l_i_box)
+
+    if site_objects is not None:
+        grouped_objects = []
+        single_objects = []
+        for name, objects in site_objects.items():
+            for object_name, object in (objects or {}).items():
+                if grouped(name):
+                    grouped_objects.append((name, cell_value(object_name), object))
+                else:
+                    single_objects.append((name, cell_value(object_name), object))
+
+    go_row=6 # start row
+    if site_objects is None:
+        worksheet.box(go_row, go_row+args.num_grouped_objects, 0, 5)
+        so_row=go_row+args.num_grouped_objects # start row
+    else:
+        worksheet.rows(go_row, grouped_objects, object_cells, 5)
+        so_row=go_row+len(grouped_objects)+1 # start row
+
+    worksheet.write(so_row, 0, 'Single objects', t9b_l)
+    worksheet.write(so_row+1, 0, 'ObjectType', t9b_l_i_box)
+    worksheet.write(so_row+1, 1, 'Object', t9b_l_i_box)
+    worksheet.write(so_row+1, 2, 'componentId', t9b_l_i_box)
+    worksheet.write(so_row+1, 3, 'NTSObjectId', t9b_l_i_box)
+    worksheet.write(so_row+1, 4, 'externalNtsId', t9b_l_i_box)
+    worksheet.write(so_row+1, 5, 'Description', t9b_l_i_box)
+
+    if site_objects is None:
+        worksheet.box(so_row+2, so_row+2+args.num_single_objects, 0, 5)
+    else:
+        worksheet.rows(so_row+2, single_objects, object_cells, 5)
+
+    # Write comments
+    worksheet.write_comment('A1',
+      "This tab contains info about all grouped objects and their single objects."+
+      "This tab should be exported to RSMP Simulators(s) as a CSV file, \n"+
+      "preferred name ''SiteId.CSV'', ex ''AB_26507_881.CSV''."+
+      "If there are multiple SiteId's for one plant (ex congestion tax) \n"+
+      "just add more Objects tabs and export them as multiple CSV files.")
+    worksheet.write_comment('B2',
+      "SiteId(s) are always sent in the first RSMP packet.\n"+
+      "The communication partners could/should use this information to validate\n"+
+      "they actually are communicating with the correct plant.")
+
+    # Adjust widths
+    worksheet.set_column(0, 0, 32)    # Object types
+    worksheet.set_column(1, 1, 34.4)  # Object
+    worksheet.set_column(2, 2, 25)    # componentId
+    worksheet.set_column(3, 3, 27.2)  # NTSObjectId
+    worksheet.set_column(4, 4, 27.2)  # externalNtsId
+    worksheet.set_column(5, 5, 57.4)  # Description
 
 # Aggregated status
-worksheet = workbook.add_worksheet('Aggregated status')
+worksheet = Sheet('Aggregated status')
 worksheet.write('A1', 'Aggregated status per grouped object', t18b)
 worksheet.write('A3', 'Revision date:', t9b_r)
 worksheet.write('B3', 'yyyy-mm-dd', t9_c)
@@ -225,12 +498,12 @@ for item in (title):
     worksheet.write(15, col, item, t9b_l_i_box)
     col += 1
 
-for col in range(0,5):
-    for row in range(6,13):
-        worksheet.write(row, col, "", t9_box)
-
-worksheet.write('A7', 'Plant', t9_box)
-worksheet.write('B7', 'See state-bit definitions below', t9_box)
+if sxl:
+    worksheet.rows(6, grouped_types, aggregated_status_cells, 4)
+else:
+    worksheet.box(6, 13, 0, 4)
+    worksheet.write('A7', 'Plant', t9_box)
+    worksheet.write('B7', 'See state-bit definitions below', t9_box)
 
 row = 16
 bits = (
@@ -244,10 +517,20 @@ bits = (
     ['8', 'Not Connected']
 )
 
+# Titles and descriptions of the state bits of the SXL, of the first
+# grouped object type
+states = {}
+if sxl and grouped_types:
+    states = grouped_types[0][1]['aggregated_status'] or {}
+
 for bit, description in (bits):
+    state = states.get(int(bit)) or states.get(bit) or {}
     worksheet.write(row, 0, bit, t9_c_box)
-    worksheet.write(row, 1, description, t9_box)
-    worksheet.write(row, 2, "", t9_box)
+    worksheet.write(row, 1, state.get('title', description), t9_box)
+    if state.get('description') is not None:
+        worksheet.write(row, 2, state['description'], t9_box_wrap)
+    else:
+        worksheet.write(row, 2, "", t9_box)
     row += 1
 
 # Write comments
@@ -264,7 +547,7 @@ worksheet.set_column(3, 3, 31.38)
 worksheet.set_column(4, 4, 32.13)
 
 # Alarms
-worksheet = workbook.add_worksheet('Alarms')
+worksheet = Sheet('Alarms')
 worksheet.write('A1', 'Alarms per object type', t18b)
 worksheet.write('A3', 'Revision date:', t9b_r)
 worksheet.write('B3', 'yyyy-mm-dd', t9_c)
@@ -284,9 +567,11 @@ title = [
 col = 0
 for item in (title):
     worksheet.write(5, col, item, t9b_l_i_box)
-    for row in range(6,args.num_alarms):
-        worksheet.write(row, col, "", t9_box)
     col += 1
+if sxl:
+    worksheet.rows(6, alarms, alarm_cells, 7 + 4*args.alarm_rvs)
+else:
+    worksheet.box(6, args.num_alarms, 0, 7 + 4*args.alarm_rvs)
 
 col = 8
 return_value = [
@@ -300,8 +585,6 @@ for num in range(0,args.alarm_rvs):
     for item in (return_value):
         worksheet.write(5, col, item, t9b_l_i_box)
         worksheet.set_column(col, col, 10.13)
-        for row in range(6,args.num_alarms):
-            worksheet.write(row, col, "", t9_box)
         col += 1
 
 # Write comments
@@ -326,7 +609,7 @@ worksheet.set_column(4, 4, 32.13)
 worksheet.set_column(5, 5, 32.13)
 
 # Status
-worksheet = workbook.add_worksheet('Status')
+worksheet = Sheet('Status')
 worksheet.write('A1', 'Status per object type', t18b)
 worksheet.write('A3', 'Revision date:', t9b_r)
 worksheet.write('B3', 'yyyy-mm-dd', t9_c)
@@ -342,9 +625,11 @@ title = [
 col = 0
 for item in (title):
     worksheet.write(5, col, item, t9b_l_i_box)
-    for row in range(6,args.num_statuses):
-        worksheet.write(row, col, "", t9_box)
     col += 1
+if sxl:
+    worksheet.rows(6, statuses, status_cells, 3 + 4*args.status_rvs)
+else:
+    worksheet.box(6, args.num_statuses, 0, 3 + 4*args.status_rvs)
 
 col = 4
 return_value = [
@@ -358,8 +643,6 @@ for num in range(0,args.status_rvs):
     for item in (return_value):
         worksheet.write(5, col, item, t9b_l_i_box)
         worksheet.set_column(col, col, 10.13)
-        for row in range(6,args.num_statuses):
-            worksheet.write(row, col, "", t9_box)
         col += 1
 
 # Write comments
@@ -385,7 +668,7 @@ for num in range(0,args.status_rvs):
     worksheet.set_column(col+(4*num)+3, col+(4*num)+3, 16.13)
 
 # Commands
-worksheet = workbook.add_worksheet('Commands')
+worksheet = Sheet('Commands')
 worksheet.write('A1', 'Commands per object type', t18b)
 worksheet.write('A3', 'Revision date:', t9b_r)
 worksheet.write('B3', 'yyyy-mm-dd', t9_c)
@@ -404,9 +687,8 @@ col = 0
 fp_row = 6 # start row
 for item in (title):
     worksheet.write(5, col, item, t9b_l_i_box)
-    for row in range(fp_row,fp_row+args.num_command_functional_position):
-        worksheet.write(row, col, "", t9_box)
     col += 1
+worksheet.box(fp_row, fp_row+args.num_command_functional_position, 0, 3 + 5*args.command_args)
 
 col = 4
 argument = [
@@ -420,8 +702,6 @@ for num in range(0,args.command_args):
     worksheet.merge_range(fp_row-2, col, fp_row-2, col+4, 'argument', t9b_c_i_box)
     for item in (argument):
         worksheet.write(fp_row-1, col, item, t9b_l_i_box)
-        for row in range(fp_row,fp_row+args.num_command_functional_position):
-            worksheet.write(row, col, "", t9_box)
         col += 1
 
 fs_row = fp_row + args.num_command_functional_position + 3
@@ -430,16 +710,13 @@ worksheet.write(fs_row-2, 0, 'Functional state', t9b_l)
 col = 0
 for item in (title):
     worksheet.write(fs_row-1, col, item, t9b_l_i_box)
-    for row in range(fs_row,fs_row+args.num_command_functional_state):
-        worksheet.write(row, col, "", t9_box)
     col += 1
+worksheet.box(fs_row, fs_row+args.num_command_functional_state, 0, 3 + 5*args.command_args)
 col = 4
 for num in range(0,args.command_args):
     worksheet.merge_range(fs_row-2, col, fs_row-2, col+4, 'argument', t9b_c_i_box)
     for item in (argument):
         worksheet.write(fs_row-1, col, item, t9b_l_i_box)
-        for row in range(fs_row,fs_row+args.num_command_functional_state):
-            worksheet.write(row, col, "", t9_box)
         col += 1
 
 m_row = fs_row + args.num_command_functional_state + 3
@@ -448,16 +725,13 @@ worksheet.write(m_row-2, 0, 'Manouver', t9b_l)
 col = 0
 for item in (title):
     worksheet.write(m_row-1, col, item, t9b_l_i_box)
-    for row in range(m_row,m_row+args.num_command_maneuver):
-        worksheet.write(row, col, "", t9_box)
     col += 1
+worksheet.box(m_row, m_row+args.num_command_maneuver, 0, 3 + 5*args.command_args)
 col = 4
 for num in range(0,args.command_args):
     worksheet.merge_range(m_row-2, col, m_row-2, col+4, 'argument', t9b_c_i_box)
     for item in (argument):
         worksheet.write(m_row-1, col, item, t9b_l_i_box)
-        for row in range(m_row,m_row+args.num_command_maneuver):
-            worksheet.write(row, col, "", t9_box)
         col += 1
 
 p_row = m_row + args.num_command_maneuver + 3
@@ -466,16 +740,16 @@ worksheet.write(p_row-2, 0, 'Parameter', t9b_l)
 col = 0
 for item in (title):
     worksheet.write(p_row-1, col, item, t9b_l_i_box)
-    for row in range(p_row,p_row+args.num_command_parameters):
-        worksheet.write(row, col, "", t9_box)
     col += 1
+if sxl:
+    worksheet.rows(p_row, commands, command_cells, 3 + 5*args.command_args)
+else:
+    worksheet.box(p_row, p_row+args.num_command_parameters, 0, 3 + 5*args.command_args)
 col = 4
 for num in range(0,args.command_args):
     worksheet.merge_range(p_row-2, col, p_row-2, col+4, 'argument', t9b_c_i_box)
     for item in (argument):
         worksheet.write(p_row-1, col, item, t9b_l_i_box)
-        for row in range(p_row,p_row+args.num_command_parameters):
-            worksheet.write(row, col, "", t9_box)
         col += 1
 
 # Write comments
@@ -501,4 +775,6 @@ for num in range(0,args.command_args):
     worksheet.set_column(col+(5*num), col+(5*num)+3, 8)
     worksheet.set_column(col+(5*num)+4, col+(5*num)+4, 16.13)
 
+for sheet in sheets:
+    sheet.close()
 workbook.close()
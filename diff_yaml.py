@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Compares versions of an SXL in yaml and lists the object types, alarms,
+# statuses, commands and arguments added, removed or changed, as an rst
+# changelog section and in json.
+#
+# The SXLs are read into the model of yaml2rst. Each object type and each
+# alarm, status and command is hashed once, by a digest of its subtree, so
+# unchanged ones are skipped by comparing digests, and only the subtrees
+# that differ are compared field by field. Given more than two files, each
+# version is compared with the next, and each file is only read and hashed
+# once
+
+import sys
+import json
+import argparse
+import sxl_yaml
+import sxl_model
+import sxl_text
+import atomic_write
+
+# Code types with the type of their changes
+CODE_TYPES = [('alarms', 'alarm'), ('statuses', 'status'), ('commands', 'command')]
+CHANGE_TYPES = [change_type for code_type, change_type in CODE_TYPES]
+
+# Fields of object types compared field by field. The codes are compared
+# by their digests
+OBJECT_FIELDS = [name for name in sxl_model.ObjectType.FIELDS
+                 if name not in [code_type for code_type, change_type in CODE_TYPES]]
+
+# Values longer than this are only reported as changed in the rst
+MAX_VALUE = 60
+
+# An SXL read and hashed for comparing. objects has the digest, model and
+# codes of each object type by name, the codes being the digest and model
+# of each alarm, status and command by (type, code id)
+class Version:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.sxl = sxl_model.build(sxl_yaml.load(f))
+        self.objects = {}
+        for object in self.sxl.objects:
+            codes = {}
+            for code_type, change_type in CODE_TYPES:
+                for code in getattr(object, code_type):
+                    codes[(change_type, code.id)] = (sxl_model.digest(code), code)
+            self.objects[object.name] = (sxl_model.digest(object), object, codes)
+
+# Name of a model within a tuple of models
+def model_name(model):
+    if isinstance(model, sxl_model.Argument) or isinstance(model, sxl_model.EnumValue):
+        return model.name
+    return model.id
+
+# Changes between two models of the same type, as dicts with the path of
+# the field, e.g. ["arguments", "status", "values", "On"], and the change.
+# Only the given fields are compared, all of them by default. Tuples of
+# models, like arguments and enum values, are compared by name
+def compare(old, new, path=(), fields=None):
+    changes = []
+    for name in fields or old.FIELDS:
+        a = getattr(old, name)
+        b = getattr(new, name)
+        if a == b:
+            continue
+        field = path + (name,)
+        if type(a) is tuple and type(b) is tuple and all(
+                isinstance(item, sxl_model.Model) for item in a + b):
+            a = {str(model_name(item)): item for item in a}
+            b = {str(model_name(item)): item for item in b}
+            for key in a:
+                if key not in b:
+                    changes.append({'field': list(field + (key,)), 'change': 'removed'})
+            for key in b:
+                if key not in a:
+                    changes.append({'field': list(field + (key,)), 'change': 'added'})
+                elif a[key] != b[key]:
+                    changes += compare(a[key], b[key], field + (key,))
+        else:
+            changes.append({'field': list(field), 'change': 'changed',
+                            'old': sxl_model.plain(a), 'new': sxl_model.plain(b)})
+    return changes
+
+# Alarms, statuses and commands in the order of yaml2rst
+def code_order(item):
+    return (CHANGE_TYPES.index(item['type']), sxl_text.sort_cid(item['id']), item['objectType'])
+
+# Differences between two versions. Object types and codes with the same
+# digest in both are skipped without looking into them
+def diff(old, new):
+    result = {'old': old.path, 'new': new.path, 'added': [], 'removed': [], 'changed': []}
+    added = []
+    removed = []
+    changed = []
+    for name, (old_digest, old_object, old_codes) in old.objects.items():
+        if name not in new.objects:
+            result['removed'].append({'objectType': name, 'type': 'object type'})
+            removed += [{'objectType': name, 'type': change_type, 'id': code_id}
+                        for change_type, code_id in old_codes]
+    for name, (new_digest, object, codes) in new.objects.items():
+        if name not in old.objects:
+            result['added'].append({'objectType': name, 'type': 'object type'})
+            added += [{'objectType': name, 'type': change_type, 'id': code_id}
+                      for change_type, code_id in codes]
+            continue
+        old_digest, old_object, old_codes = old.objects[name]
+        if old_digest == new_digest:
+            continue
+
+        # The codes are compared by their digests, the rest of the object
+        # type field by field
+        changes = compare(old_object, object, fields=OBJECT_FIELDS)
+        if changes:
+            result['changed'].append({'objectType': name, 'type': 'object type',
+                                      'changes': changes})
+        for key in old_codes:
+            if key not in codes:
+                removed.append({'objectType': name, 'type': key[0], 'id': key[1]})
+        for key, (code_digest, code) in codes.items():
+            if key not in old_codes:
+                added.append({'objectType': name, 'type': key[0], 'id': key[1]})
+            elif old_codes[key][0] != code_digest:
+                changed.append({'objectType': name, 'type': key[0], 'id': key[1],
+                                'changes': compare(old_codes[key][1], code)})
+
+    result['added'] += sorted(added, key=code_order)
+    result['removed'] += sorted(removed, key=code_order)
+    result['changed'] += sorted(changed, key=code_order)
+    return result
+
+# Characters escaped in text
+MARKUP = "\\`*_|"
+
+def escape(text):
+    return "".join("\\" + c if c in MARKUP else c for c in text)
+
+# A value as inline literal. Empty values can't be literals in rst, nor
+# can values with backticks or line breaks, or starting or ending with
+# whitespace. Those are written as text, with the markup escaped
+def literal(value):
+    if value is None or str(value) == "":
+        return "(empty)"
+    value = str(value)
+    if "`" in value or "\n" in value or value != value.strip():
+        return escape(value.replace("\n", " "))
+    return "``" + value + "``"
+
+# A line of the changelog for an object type or code
+def title(item):
+    if item['type'] == 'object type':
+        return "Object type " + literal(item['objectType'])
+    return literal(item['id']) + " (" + escape(item['objectType']) + ", " + item['type'] + ")"
+
+# A line of the changelog for a change of a field
+def change_line(change):
+    field = literal(": ".join(change['field']))
+    if change['change'] != 'changed':
+        return field + " " + change['change']
+    old = change['old']
+    new = change['new']
+    if all(type(value) in (str, int, float, bool) or value is None for value in [old, new]) and \
+       all("\n" not in str(value) and len(str(value)) <= MAX_VALUE for value in [old, new]):
+        return field + " changed from " + literal(old) + " to " + literal(new)
+    return field + " changed"
+
+def heading(out, text, underline):
+    out.write(text + "\n" + underline * len(text) + "\n\n")
+
+# Write the differences as an rst section, with a subsection for each of
+# added, removed and changed
+def write_rst(result, out):
+    heading(out, "Changes from " + result['old'] + " to " + result['new'], "-")
+    if not (result['added'] or result['removed'] or result['changed']):
+        out.write("No changes\n\n")
+        return
+    for name, title_text in [('added', "Added"), ('removed', "Removed"), ('changed', "Changed")]:
+        if not result[name]:
+            continue
+        heading(out, title_text, "^")
+        for item in result[name]:
+            out.write("* " + title(item) + "\n")
+            if item.get('changes'):
+                out.write("\n")
+                for change in item['changes']:
+                    out.write("  * " + change_line(change) + "\n")
+                out.write("\n")
+        out.write("\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='List the differences between versions ' +
+        'of an SXL in yaml, as an rst changelog and json')
+    parser.add_argument('yaml', nargs='+',
+        help='SXLs in yaml format, oldest first. Each is compared with the next')
+    parser.add_argument('-o', '--output',
+        help='Write the rst to file instead of stdout')
+    parser.add_argument('--json', metavar='FILE',
+        help='Also write the differences in json to FILE, a list with one entry ' +
+        'for each pair of versions')
+    args = parser.parse_args()
+
+    if len(args.yaml) < 2:
+        parser.error("at least two yaml files are needed")
+
+    versions = {}
+    for path in dict.fromkeys(args.yaml):
+        try:
+            versions[path] = Version(path)
+        except Exception as e:
+            message = str(e)
+            if not isinstance(e, (OSError, sxl_yaml.yaml.YAMLError)):
+                message = type(e).__name__ + ": " + message
+            print("Error: " + path + ": " + message, file=sys.stderr)
+            sys.exit(1)
+
+    results = [diff(versions[old], versions[new]) for old,new in zip(args.yaml, args.yaml[1:])]
+
+    def write_results(out):
+        for result in results:
+            write_rst(result, out)
+
+    # The files are replaced when complete
+    try:
+        if args.output:
+            atomic_write.write(args.output, write_results)
+        else:
+            write_results(sys.stdout)
+        if args.json:
+            atomic_write.write_text(args.json, json.dumps(results, indent=2, ensure_ascii=False,
+                                                          default=str) + "\n")
+    except OSError as e:
+        print("Error: " + str(e), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Expands a site configuration into the alarms, statuses and commands of
+# each of its components, as used by the RSMP simulator: one row for each
+# component and each alarm, status and command of its object type.
+#
+# Rows are generated one at a time from the SXL and the site, so the whole
+# product of components and codes is never built in memory. The arguments
+# of a row are the ones of the SXL, shared by all rows of the code.
+#
+# Sites list their components under "components" (SXL 1.3.0 and later) or
+# "objects" (SXL 1.1). The SXL can be given separately, or be merged into
+# the site configuration by merge_yaml.rb or merge_yaml.py
+
+import sys
+import json
+import argparse
+import collections
+import sxl_yaml
+import atomic_write
+
+# Code types with the type of their rows
+CODE_TYPES = [('alarms', 'alarm'), ('statuses', 'status'), ('commands', 'command')]
+
+Row = collections.namedtuple('Row', ['site', 'object_type', 'object', 'component_id',
+                                     'nts_object_id', 'type', 'code', 'command', 'arguments'])
+
+# Header of the rows in csv, and their keys in jsonl
+FIELDS = ['site', 'objectType', 'object', 'componentId', 'ntsObjectId', 'type', 'codeId',
+          'command', 'arguments']
+
+# Components of a site as (object type, object, component)
+def components(site):
+    objects = site.get('components')
+    if objects is None:
+        objects = site.get('objects')
+    for object_type, items in (objects or {}).items():
+        for name, component in (items or {}).items():
+            yield object_type, name, component or {}
+
+# Alarms, statuses and commands of an object type of the SXL as
+# (type, code id, code), filtered by code id if codes is given
+def object_codes(object, codes=None):
+    result = []
+    for code_type, row_type in CODE_TYPES:
+        for code_id, code in (object.get(code_type) or {}).items():
+            if codes is None or code_id in codes:
+                result.append((row_type, code_id, code))
+    return result
+
+# Generate the rows of the sites of a site configuration, in the order of
+# the sites, components and codes. object_types and codes filter the rows
+# by object type and code id. Components of object types the SXL doesn't
+# have are reported once and skipped
+def expand(sxl_objects, site_yaml, object_types=None, codes=None):
+    codes_of = {}
+    missing = set()
+    for site_id, site in (site_yaml.get('sites') or {}).items():
+        for object_type, name, component in components(site or {}):
+            if object_types is not None and object_type not in object_types:
+                continue
+            if object_type not in codes_of:
+                object = sxl_objects.get(object_type)
+                if object is None:
+                    if object_type not in missing:
+                        print("Warning: object type " + str(object_type) +
+                              " not found in the SXL", file=sys.stderr)
+                        missing.add(object_type)
+                    continue
+                codes_of[object_type] = object_codes(object, codes)
+            for row_type, code_id, code in codes_of[object_type]:
+                yield Row(site_id, object_type, name, component.get('componentId'),
+                          component.get('ntsObjectId'), row_type, code_id,
+                          code.get('command'), code.get('arguments') or {})
+
+def to_s(value):
+    if value is None:
+        return ""
+    if value is True or value is False:
+        return str(value).lower()
+    return str(value)
+
+# A value quoted like Excel and xlsx2csv.rb do
+def csv_value(value):
+    value = to_s(value)
+    if '"' in value:
+        value = value.replace('"', '""')
+    if "\n" in value or ";" in value or '"' in value:
+        value = '"' + value + '"'
+    return value
+
+# Write rows like xlsx2csv.rb: separated by ";" and ended by CRLF, with the
+# names of the arguments on lines of their own in the last column
+def write_csv(rows, out):
+    out.write(";".join(FIELDS) + "\r\n")
+    for row in rows:
+        values = list(row[:-1]) + ["\n".join(to_s(name) for name in row.arguments)]
+        out.write(";".join(csv_value(value) for value in values) + "\r\n")
+
+# Write rows as json lines, with the arguments as in the SXL
+def write_jsonl(rows, out):
+    for row in rows:
+        out.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False, default=str) + "\n")
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Expand the components of a site ' +
+        'configuration into the alarms, statuses and commands of each component')
+    parser.add_argument('--site', required=True, metavar='YAML',
+        help='Site configuration, with the objects of the SXL if --sxl is not given')
+    parser.add_argument('--sxl', metavar='YAML',
+        help='Signal Exchange List (default: the objects of the site configuration)')
+    parser.add_argument('--object-type', action='append', metavar='TYPE',
+        help='Only expand components of object type TYPE, may be given more than once')
+    parser.add_argument('--code', action='append', metavar='ID',
+        help='Only expand the alarm, status or command ID, may be given more than once')
+    parser.add_argument('--format', default='csv', choices=list(WRITERS),
+        help='Output format (default: csv)')
+    parser.add_argument('--encoding',
+        help='Encoding of the output (default: cp1252 for csv, like xlsx2csv.rb, ' +
+        'and utf-8 for jsonl)')
+    parser.add_argument('-o', '--output',
+        help='Write to file instead of stdout')
+    args = parser.parse_args()
+
+    try:
+        site_yaml = sxl_yaml.load_file(args.site)
+        sxl = site_yaml
+        if args.sxl:
+            sxl = sxl_yaml.load_file(args.sxl)
+    except (OSError, sxl_yaml.yaml.YAMLError) as e:
+        print("Error: " + str(e), file=sys.stderr)
+        sys.exit(1)
+    if not isinstance(site_yaml, dict) or not site_yaml.get('sites'):
+        print("Error: " + args.site + ": no sites in the site configuration", file=sys.stderr)
+        sys.exit(1)
+    if not isinstance(sxl, dict) or not sxl.get('objects'):
+        print("Error: " + (args.sxl or args.site) + ": no objects in the SXL", file=sys.stderr)
+        sys.exit(1)
+
+    encoding = args.encoding or ('cp1252' if args.format == 'csv' else 'utf-8')
+    rows = expand(sxl['objects'], site_yaml,
+                  set(args.object_type) if args.object_type else None,
+                  set(args.code) if args.code else None)
+    # The output file is replaced when complete
+    try:
+        if args.output:
+            atomic_write.write(args.output, lambda out: WRITERS[args.format](rows, out),
+                               encoding, newline='')
+        else:
+            sys.stdout.flush()
+            with open(sys.stdout.fileno(), 'w', encoding=encoding, newline='',
+                      closefd=False) as out:
+                WRITERS[args.format](rows, out)
+    except (OSError, LookupError, UnicodeError) as e:
+        print("Error: " + str(e), file=sys.stderr)
+        sys.exit(1)
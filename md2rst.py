@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Converts markdown descriptions of the SXL to restructuredText
+#
+# The markdown subset used by most descriptions is converted by a built-in
+# converter. The rest is converted by pandoc. Starting pandoc is much more
+# expensive than the conversion itself, so descriptions are collected up
+# front and converted in a few large pandoc runs, separated by a unique
+# delimiter paragraph. Converted descriptions can also be kept in an on-disk
+# cache shared between runs.
+#
+# Run as a script to compare the built-in converter with pandoc for all
+# descriptions of one or more SXLs.
+
+import os
+import re
+import sys
+import argparse
+import json
+import math
+import time
+import hashlib
+import unicodedata
+import atomic_write
+
+# pypandoc is only needed for descriptions the built-in converter can't
+# handle, and is slow to import, so it's imported by load_pypandoc() when
+# first needed. Modules only used to run pandoc are imported where used
+pypandoc = None
+
+# Import pypandoc, or return None if it's not installed
+def load_pypandoc():
+    global pypandoc
+    if pypandoc is None:
+        try:
+            import pypandoc
+        except ImportError:
+            return None
+    return pypandoc
+
+FROM_FORMAT = 'md'
+TO_FORMAT = 'rst'
+
+def require_pypandoc():
+    if load_pypandoc() is None:
+        sys.exit("Error: pypandoc is needed to convert descriptions " +
+                 "not supported by the built-in converter")
+
+# Convert markdown to restructuredText, or to_format, using pandoc
+def pandoc(text, to_format=TO_FORMAT):
+    require_pypandoc()
+    return pypandoc.convert_text(text, to_format, format=FROM_FORMAT)
+
+# Lines that may be, or contain, a header
+header = re.compile(r'^[\s>*+\-\d.)]*#')
+
+# Check if a description can share a pandoc run with other descriptions.
+# Anything that could reach outside of its own description, like reference
+# links, footnotes, images, headers, title blocks, code fences and raw html,
+# is converted on its own to keep the output identical.
+def batchable(text):
+    if text.strip() == "" or text.lstrip().startswith("%"):
+        return False
+
+    for token in ("]:", "[^", "^[", "![", "<"):
+        if token in text:
+            return False
+
+    for line in text.split("\n"):
+        line = line.strip()
+        if line.startswith(("```", "~~~")) or header.match(line):
+            return False
+
+        # Setext headers and horizontal rules
+        if line and line.strip("=-*_ ") == "":
+            return False
+
+    return True
+
+# Built-in conversion of the markdown subset used by SXL descriptions:
+# paragraphs, bullet lists, inline code, emphasis, strong emphasis and links.
+# Produces the same output as pandoc, and returns None for anything else so
+# the description can be converted by pandoc instead.
+
+# pandoc wraps lines at 72 characters
+WIDTH = 72
+
+# pandoc puts a non-breaking space after these abbreviations
+ABBREVIATIONS = set("""
+    aet. aetat. al. Apr. Aug. bk. Bros. c. Capt. cf. ch. chap. chs. Co. col.
+    Corp. cp. d. Dec. Dr. e.g. ed. eds. esp. f. fasc. Feb. ff. fig. fl. fol.
+    fols. Fr. Gen. Gov. Hon. i.e. ill. Inc. incl. Jan. Jr. Jul. Jun. Ltd. M.A.
+    M.D. Mar. Mr. Mrs. Ms. n. n.b. nn. No. Nov. Oct. p. Ph.D. pp. Pres. Prof.
+    pt. q.v. Rep. Rev. s.v. s.vv. saec. sec. Sen. Sep. Sept. Sgt. Sr. St.
+    univ. viz. vol. vs.
+    """.split())
+
+bullet_item = re.compile(r'^([-*+])( {1,4})(\S.*)$')
+
+# Lines that could start a list, header, block quote, definition etc.
+block_start = re.compile(r'^(\(?([0-9]+|[A-Za-z]|[ivxlcdmIVXLCDM]+|#)[.)]|[-*+])(\s|$)|^[#>:|~<]')
+
+inline_markup = re.compile(r'(`{1,2})([^`\s](?:[^`\n]*[^`\s])?)\1'
+                           r'|\*\*([^*\s](?:[^*]*[^*\s])?)\*\*'
+                           r'|\*([^*\s](?:[^*]*[^*\s])?)\*'
+                           r'|\[([^\[\]]+)\]\(([-A-Za-z0-9._~:/?#@!$+,;=%]+)\)')
+
+# Characters allowed around inline markup
+before_markup = " \n("
+after_markup = " \n.,:;!?)"
+
+# Check that a character takes up a single column
+def narrow(c):
+    if c.isascii():
+        return c.isprintable()
+    return (unicodedata.category(c)[0] in "LNPS" and
+            unicodedata.east_asian_width(c) not in "WF")
+
+# Check if a word ends with an abbreviation
+def abbreviation(word):
+    i = len(word)
+    while i > 0 and (word[i-1].isalnum() or word[i-1] == "."):
+        i -= 1
+    return word[i:] in ABBREVIATIONS
+
+# Convert plain text, or None if it contains anything special to markdown
+def native_text(text):
+    out = []
+    for i, c in enumerate(text):
+        if c.isalnum() or c in " \n.,;:!?()-/=+%#":
+            pass
+        elif c in "'_&":
+            prev = text[i-1] if i > 0 else " "
+            next = text[i+1] if i + 1 < len(text) else " "
+            if c == "&":
+                if next.isalnum() or next == "#":
+                    return None
+            elif not (prev.isalnum() and next.isalnum()):
+                return None
+            elif c == "'":
+                c = "’"
+        elif c.isascii() or not narrow(c):
+            return None
+        if not narrow(c) and c not in " \n":
+            return None
+        out.append(c)
+
+    for token in ("..", "--", "::"):
+        if token in text:
+            return None
+
+    # Breakable spaces are marked by \0, or \1 if they were a line break.
+    # Abbreviations followed by a space gets a non-breaking space
+    parts = re.split(r'([ \n]+)', "".join(out))
+    for i in range(1, len(parts), 2):
+        space = "\1" if "\n" in parts[i] else "\0"
+        if parts[i].startswith(" ") and abbreviation(parts[i-1]):
+            space = "\u00a0" + space.replace("\0", "")
+        parts[i] = space
+    return "".join(parts)
+
+# Convert the inlines of a paragraph or list item
+def native_inlines(text):
+    out = []
+    pos = 0
+    for m in inline_markup.finditer(text):
+        if m.start() > 0 and text[m.start()-1] not in before_markup:
+            return None
+        if m.end() < len(text) and text[m.end()] not in after_markup:
+            return None
+
+        out.append(native_text(text[pos:m.start()]))
+        ticks, code, strong, emph, link, url = m.groups()
+        if code is not None:
+            if not all(narrow(c) for c in code):
+                return None
+            out.append("``" + code + "``")
+        elif strong is not None:
+            out += ["**", native_text(strong), "**"]
+        elif emph is not None:
+            out += ["*", native_text(emph), "*"]
+        else:
+            if link.strip() != link or link == url or url.startswith("mailto:"):
+                return None
+            out += ["`", native_text(link), " <" + url + ">`__"]
+        pos = m.end()
+    out.append(native_text(text[pos:]))
+
+    if None in out:
+        return None
+    return "".join(out).strip("\0\1")
+
+# Wrap inlines into lines of at most width characters
+def wrap(inlines, width):
+    words = re.split("[\0\1]", inlines)
+    lines = [words[0]]
+    for word in words[1:]:
+        if len(lines[-1]) + 1 + len(word) <= width:
+            lines[-1] += " " + word
+        else:
+            lines.append(word)
+    return lines
+
+# Convert markdown to restructuredText without pandoc.
+# Returns None if the markdown isn't supported
+def native(text):
+    if text.lstrip().startswith("%"):
+        return None
+
+    # Split into paragraphs and bullet lists.
+    # A paragraph is a list of lines, a list is [marker, loose, items]
+    blocks = []
+    lines = text.split("\n")
+    blank = True
+    for n, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped == "":
+            blank = True
+            continue
+
+        # Hard line breaks, horizontal rules and setext headers
+        if line.endswith("  ") and n + 1 < len(lines) and lines[n+1].strip():
+            return None
+        if stripped.strip("=-*_ ") == "":
+            return None
+
+        current = blocks[-1] if blocks else None
+        item = bullet_item.match(line)
+        if item:
+            marker, space, content = item.groups()
+            if block_start.match(content):
+                return None
+            if type(current) is list:
+                if current[0] != marker:
+                    return None
+                current[1] = current[1] or blank
+                current[2].append([content])
+            elif blank:
+                blocks.append([marker, False, [[content]]])
+            else:
+                return None
+        elif block_start.match(stripped):
+            return None
+        elif blank:
+            if line.startswith("    ") or (type(current) is list and line.startswith(" ")):
+                return None
+            blocks.append((line,))
+        elif type(current) is list:
+            current[2][-1].append(line)
+        else:
+            blocks[-1] += (line,)
+        blank = False
+
+    if not blocks:
+        return None
+
+    rst = []
+    for block in blocks:
+        if type(block) is tuple:
+            inlines = native_inlines("\n".join(block))
+            if inlines is None:
+                return None
+            rst.append("\n".join(wrap(inlines, WIDTH)))
+        else:
+            marker, loose, items = block
+            rst_items = []
+            for item in items:
+                inlines = native_inlines("\n".join(item))
+                if inlines is None:
+                    return None
+                rst_items.append("- " + "\n  ".join(wrap(inlines, WIDTH - 2)))
+            rst.append(("\n\n" if loose else "\n").join(rst_items))
+
+    return "\n\n".join(rst) + "\n"
+
+# Default location of the on-disk cache
+def default_cache_dir():
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "sxl-tools", "md2rst")
+
+# The pandoc binaries pypandoc chooses between
+def pandoc_binaries():
+    if os.getenv("PYPANDOC_PANDOC"):
+        return [os.getenv("PYPANDOC_PANDOC")]
+    require_pypandoc()
+    import shutil
+    return [shutil.which("pandoc"),
+            os.path.join(os.path.dirname(pypandoc.__file__), "files", "pandoc")]
+
+# Identifies the installed pandoc binaries without running them
+def pandoc_fingerprint():
+    fingerprint = []
+    for path in pandoc_binaries():
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            fingerprint.append(os.path.realpath(path) + ":" +
+                str(st.st_mtime_ns) + ":" + str(st.st_size))
+    return ";".join(fingerprint)
+
+# Content-addressed cache of converted descriptions.
+# Entries are keyed by a hash of the pandoc version, the formats and the
+# markdown. The least recently used entries are removed when the cache
+# grows beyond max_size bytes.
+class Cache:
+    def __init__(self, path=None, max_size=64*1024*1024):
+        self.path = path or default_cache_dir()
+        self.max_size = max_size
+        self.version = None
+        self.added = False
+        os.makedirs(self.path, exist_ok=True)
+
+    # Version of pandoc, only probed when the binaries have changed
+    def pandoc_version(self):
+        if self.version is None:
+            version_file = os.path.join(self.path, "pandoc.json")
+            fingerprint = pandoc_fingerprint()
+            try:
+                with open(version_file, encoding='utf-8') as f:
+                    known = json.load(f)
+                if known['fingerprint'] == fingerprint:
+                    self.version = known['version']
+            except (OSError, ValueError, KeyError):
+                pass
+
+            if self.version is None:
+                require_pypandoc()
+                self.version = pypandoc.get_pandoc_version()
+                atomic_write.write_text(version_file, json.dumps({
+                    'fingerprint': fingerprint,
+                    'version': self.version}))
+        return self.version
+
+    def entry(self, text, to_format=TO_FORMAT):
+        key = hashlib.sha256("\0".join([self.pandoc_version(), FROM_FORMAT,
+            to_format, text]).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, key[:2], key)
+
+    # Get a converted description, or None if not cached
+    def get(self, text, to_format=TO_FORMAT):
+        path = self.entry(text, to_format)
+        try:
+            with open(path, encoding='utf-8') as f:
+                rst = f.read()
+        except OSError:
+            return None
+
+        # Mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return rst
+
+    def put(self, text, rst, to_format=TO_FORMAT):
+        path = self.entry(text, to_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write.write_text(path, rst)
+        self.added = True
+
+    # Remove the least recently used entries until the cache fits in max_size
+    def evict(self):
+        if not self.added:
+            return
+
+        entries = []
+        total = 0
+        for root, dirs, files in os.walk(self.path):
+            if root == self.path:
+                continue
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+        self.added = False
+
+# Converts descriptions to restructuredText, or to another format
+# supported by pandoc given by to_format
+class Converter:
+    def __init__(self, jobs=None, cache=None, builtin=True, to_format=TO_FORMAT):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache = cache
+        self.builtin = builtin and to_format == TO_FORMAT
+        self.to_format = to_format
+        self.converted = {}
+
+        # Set to a list to record (text, seconds, method, batch size) of
+        # each conversion. Descriptions converted in the same pandoc run
+        # get the time of the whole run
+        self.timings = None
+
+    # Convert with the built-in converter, if enabled and supported
+    def native(self, text):
+        if self.builtin:
+            return native(text)
+        return None
+
+    # Convert a single description, reusing earlier conversions
+    def convert(self, text):
+        if text not in self.converted:
+            if self.timings is not None:
+                start = time.perf_counter()
+            method = 'native'
+            rst = self.native(text)
+            if rst is None and self.cache:
+                method = 'cache'
+                rst = self.cache.get(text, self.to_format)
+            if rst is None:
+                method = 'pandoc'
+                rst = pandoc(text, self.to_format)
+                if self.cache:
+                    self.cache.put(text, rst, self.to_format)
+            self.converted[text] = rst
+            if self.timings is not None:
+                self.timings.append((text, time.perf_counter() - start, method, 1))
+        return self.converted[text]
+
+    # Convert several descriptions in one pandoc run.
+    # Converts them one by one if the delimiters doesn't survive
+    def convert_batch(self, texts):
+        if len(texts) == 1 or self.to_format not in ["rst", "html"]:
+            return [pandoc(text, self.to_format) for text in texts]
+
+        import uuid
+        token = "SXLTOOLS" + uuid.uuid4().hex
+        delimiter = "\n\n" + token + "\n\n"
+        converted = pandoc(delimiter.join(texts), self.to_format)
+        if self.to_format == "html":
+            parts = converted.split("<p>" + token + "</p>\n")
+        else:
+            parts = converted.split(delimiter)
+
+        if len(parts) != len(texts) or any(token in text for text in texts):
+            return [pandoc(text, self.to_format) for text in texts]
+
+        # pandoc ends each rst document with a newline, and writes the
+        # delimiter as a paragraph of its own in html
+        if self.to_format == "html":
+            return parts
+        return [part + "\n" for part in parts[:-1]] + [parts[-1]]
+
+    # Convert all descriptions not already converted, using at most
+    # self.jobs pandoc processes at once
+    def prefetch(self, texts):
+        timed = self.timings is not None
+        pending = []
+        for text in dict.fromkeys(texts):
+            if text in self.converted:
+                continue
+            if timed:
+                start = time.perf_counter()
+            method = 'native'
+            rst = self.native(text)
+            if rst is None and self.cache:
+                method = 'cache'
+                rst = self.cache.get(text, self.to_format)
+            if rst is None:
+                pending.append(text)
+            else:
+                self.converted[text] = rst
+                if timed:
+                    self.timings.append((text, time.perf_counter() - start, method, 1))
+        if not pending:
+            return
+
+        batched = [t for t in pending if batchable(t)]
+        size = max(1, math.ceil(len(batched) / self.jobs))
+        batches = [batched[i:i+size] for i in range(0, len(batched), size)]
+        batches += [[t] for t in pending if not batchable(t)]
+
+        # Locate pandoc once, before the threads start
+        require_pypandoc()
+        pypandoc.get_pandoc_version()
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for batch, (results, seconds) in zip(batches, executor.map(self.timed_batch, batches)):
+                for text, rst in zip(batch, results):
+                    self.converted[text] = rst
+                    if self.cache:
+                        self.cache.put(text, rst, self.to_format)
+                    if timed:
+                        self.timings.append((text, seconds, 'pandoc', len(batch)))
+
+    def timed_batch(self, texts):
+        start = time.perf_counter()
+        results = self.convert_batch(texts)
+        return results, time.perf_counter() - start
+
+# Collect all descriptions of a yaml tree
+def descriptions(node):
+    if type(node) is dict:
+        for key,value in node.items():
+            if key == "description" and type(value) is str:
+                yield value
+            else:
+                yield from descriptions(value)
+    elif type(node) is list:
+        for value in node:
+            yield from descriptions(value)
+
+# Compare the built-in converter with pandoc for descriptions. Returns
+# the number of descriptions supported by the built-in converter, and
+# (description, built-in rst, pandoc rst) of each that differs
+def compare(texts, jobs=None):
+    texts = list(dict.fromkeys(texts))
+    converter = Converter(jobs, builtin=False)
+    converter.prefetch(texts)
+
+    supported = 0
+    differences = []
+    for text in texts:
+        rst = native(text)
+        if rst is None:
+            continue
+        supported += 1
+        if rst != converter.converted[text]:
+            differences.append((text, rst, converter.converted[text]))
+    return supported, differences
+
+# Compare the built-in converter with pandoc for all descriptions of the
+# given SXLs. Returns the number of descriptions that differ
+def check(paths, jobs=None):
+    import sxl_yaml
+
+    texts = []
+    for path in paths:
+        texts += descriptions(sxl_yaml.load_file(path))
+    texts = list(dict.fromkeys(texts))
+
+    supported, differences = compare(texts, jobs)
+    for text, rst, pandoc_rst in differences:
+        print("Description:\n" + text + "\n", file=sys.stderr)
+        print("Built-in converter:\n" + rst, file=sys.stderr)
+        print("pandoc:\n" + pandoc_rst, file=sys.stderr)
+
+    print(str(len(texts)) + " descriptions, " + str(supported) +
+          " supported by the built-in converter, " + str(len(differences)) + " differ")
+    return len(differences)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the built-in ' +
+        'markdown converter with pandoc for all descriptions of SXLs in yaml')
+    parser.add_argument('yaml', nargs='+', help='SXL in yaml format')
+    parser.add_argument('--jobs', type=int,
+        help='Number of concurrent pandoc processes (default: number of CPUs)')
+    args = parser.parse_args()
+
+    if check(args.yaml, args.jobs):
+        sys.exit(1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Merges an SXL with site configurations for the RSMP simulator, like
+# merge_yaml.rb, but for many sites in one run.
+#
+# The SXL is parsed once and its objects are written to yaml once. Each
+# site is merged by writing its own keys around that yaml, so the objects
+# are neither copied nor written again for each site. The sites are merged
+# by a pool of processes, each reading a site file and writing its output
+
+import io
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import sxl_yaml
+import atomic_write
+
+# The objects of the SXL in yaml, as the objects key of a site
+objects = None
+
+def init_worker(objects_yaml):
+    global objects
+    objects = objects_yaml
+
+# The objects of an SXL in yaml, as the objects key of a site
+def dump_objects(sxl):
+    out = io.StringIO()
+    sxl_yaml.dump({'objects': sxl['objects']}, out, explicit_start=False)
+    return out.getvalue()
+
+# Write a site merged with the objects to out. Like merge_yaml.rb, the
+# objects replace the objects key of the site in place, or are added last
+def write_merged(site, out):
+    keys = list(site)
+    position = len(keys)
+    if 'objects' in site:
+        position = keys.index('objects')
+    before = {key: site[key] for key in keys[:position]}
+    after = {key: site[key] for key in keys[position + 1:]}
+
+    out.write("---\n")
+    if before:
+        sxl_yaml.dump(before, out, explicit_start=False)
+    out.write(objects)
+    if after:
+        sxl_yaml.dump(after, out, explicit_start=False)
+
+# Merge a site file into output, or to stdout if output is None.
+# Returns an error message, or None if successful
+def merge(input, output):
+    try:
+        site = sxl_yaml.load_file(input)
+        if not isinstance(site, dict):
+            return "not a site configuration"
+        if output is None:
+            write_merged(site, sys.stdout)
+        else:
+            atomic_write.write(output, lambda f: write_merged(site, f))
+    except (OSError, sxl_yaml.yaml.YAMLError) as e:
+        return str(e)
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Merge the objects of an SXL into site ' +
+        'configurations in yaml, for use with the RSMP simulator')
+    parser.add_argument('--sxl', required=True, metavar='YAML',
+        help='Signal Exchange List')
+    parser.add_argument('--site', required=True, nargs='+', action='extend', metavar='YAML',
+        help='Site configurations, may be given more than once')
+    parser.add_argument('-o', '--output',
+        help='Write to file instead of stdout, with a single site')
+    parser.add_argument('--output-dir',
+        help='Directory of the merged sites, written under the name of each site file. ' +
+        'Needed with several sites')
+    parser.add_argument('--workers', type=int,
+        help='Number of processes merging sites (default: number of CPUs)')
+    args = parser.parse_args()
+
+    if args.output and (args.output_dir or len(args.site) > 1):
+        parser.error("--output can only be used with a single site and no --output-dir")
+    if len(args.site) > 1 and not args.output_dir:
+        parser.error("several sites need --output-dir")
+
+    outputs = [args.output] * len(args.site)
+    if args.output_dir:
+        outputs = [os.path.join(args.output_dir, os.path.basename(site)) for site in args.site]
+    written = set()
+    for site, output in zip(args.site, outputs):
+        if output is None:
+            continue
+        if os.path.abspath(output) == os.path.abspath(site):
+            parser.error(site + " would be overwritten by its merged site")
+        if output in written:
+            parser.error("more than one site would be written to " + output)
+        written.add(output)
+
+    try:
+        sxl = sxl_yaml.load_file(args.sxl)
+    except (OSError, sxl_yaml.yaml.YAMLError) as e:
+        print("Error: " + str(e), file=sys.stderr)
+        sys.exit(1)
+    if not isinstance(sxl, dict) or 'objects' not in sxl:
+        print("Error: " + args.sxl + ": no objects in the SXL", file=sys.stderr)
+        sys.exit(1)
+
+    init_worker(dump_objects(sxl))
+    del sxl
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    workers = min(args.workers or os.cpu_count() or 1, len(args.site))
+    if workers > 1:
+        executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(objects,))
+        errors = executor.map(merge, args.site, outputs)
+    else:
+        executor = None
+        errors = map(merge, args.site, outputs)
+
+    failed = 0
+    for site, output, error in zip(args.site, outputs, errors):
+        if error:
+            print("Error: " + site + ": " + error, file=sys.stderr)
+            failed += 1
+        elif output:
+            print(site + ": written to " + output, file=sys.stderr)
+    if executor:
+        executor.shutdown()
+    if failed:
+        sys.exit(1)
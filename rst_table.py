@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Prints tables in reStructuredText simple table format, like
+# tabulate(table, tablefmt="rst") but much faster for the tables of SXLs.
+#
+# Only tables of strings and integers are handled. Strings tabulate would
+# read as numbers or booleans, or containing control characters, are left
+# to tabulate, as are other types of values.
+#
+# Run as a script to compare with tabulate on random tables.
+
+import re
+import sys
+import random
+import argparse
+
+try:
+    import wcwidth
+except ImportError:
+    wcwidth = None
+
+# Characters handled differently by tabulate, e.g. ANSI escapes and line
+# separators other than newline
+SPECIAL = re.compile("[\x00-\x09\x0b-\x1f\x7f-\x9f\u2028\u2029]")
+
+NUMBER_START = set("0123456789+-.iInN")
+THOUSANDS = re.compile(r"^(([+-]?[0-9]{1,3})(?:,([0-9]{3}))*)?(?(1)\.[0-9]*|\.[0-9]+)?$")
+
+# Strings tabulate reads as numbers or booleans
+def numeric(text):
+    if text == "True" or text == "False":
+        return True
+    start = text.strip()[:1]
+    if start not in NUMBER_START and start.isascii():
+        return False
+    try:
+        float(text)
+        return True
+    except ValueError:
+        pass
+    return THOUSANDS.match(text) is not None
+
+# Width on screen, with wide characters if wcwidth is installed like tabulate does
+def width(text):
+    if wcwidth and not text.isascii():
+        return wcwidth.wcswidth(text)
+    return len(text)
+
+# Lines of a table, or None if it can't be printed natively.
+# The first row is the header, if headers is set
+def native(table, headers=True):
+    if not table:
+        return None
+    columns = len(table[0])
+    multiline = False
+    rows = []
+    for row in table:
+        if len(row) != columns:
+            return None
+        row = list(row)
+
+        # Empty values of the first column are escaped
+        if type(row[0]) is str and not row[0].strip():
+            row[0] = ".."
+
+        for cell in row:
+            if type(cell) is str:
+                if SPECIAL.search(cell):
+                    return None
+                if "\n" in cell:
+                    multiline = True
+            elif type(cell) is not int:
+                return None
+        rows.append(row)
+
+    head = None
+    if headers:
+        head = rows.pop(0)
+        for cell in head:
+            if type(cell) is not str or "\n" in cell:
+                return None
+
+    # Integer columns are right aligned, other columns are left aligned and
+    # stripped. Widths are the widest line of the cells and the header
+    cells = []
+    right = []
+    widths = []
+    for c in range(columns):
+        values = [row[c] for row in rows]
+        integer = False
+        for value in values:
+            if type(value) is int:
+                integer = True
+            elif value != "":
+                if numeric(value):
+                    return None
+                integer = False
+                break
+
+        if integer:
+            column = [str(value) for value in values]
+        else:
+            column = [str(value).strip() for value in values]
+
+        column_width = 0
+        if head:
+            column_width = width(head[c]) + 2
+            if column_width < 2:
+                return None
+        lines = []
+        for value in column:
+            value_lines = value.split("\n")
+            for line in value_lines:
+                w = width(line)
+                if w < 0:
+                    return None
+                if w > column_width:
+                    column_width = w
+            lines.append(value_lines)
+
+        cells.append(lines)
+        right.append(integer)
+        widths.append(column_width)
+
+    def pad(text, c):
+        fill = " " * (widths[c] - width(text))
+        if right[c]:
+            return fill + text
+        return text + fill
+
+    rule = "  ".join("=" * w for w in widths).rstrip()
+    result = [rule]
+    if head:
+        result.append("  ".join(pad(head[c], c) for c in range(columns)).rstrip())
+        result.append(rule)
+
+    for r in range(len(rows)):
+        if not multiline:
+            result.append("  ".join(pad(cells[c][r][0], c) for c in range(columns)).rstrip())
+            continue
+
+        # Empty cells of multiline tables have no lines, so a row
+        # of empty cells disappears
+        row = [cells[c][r] if rows[r][c] != "" else [] for c in range(columns)]
+        for i in range(max(len(lines) for lines in row)):
+            result.append("  ".join(pad(lines[i], c) if i < len(lines) else " " * widths[c]
+                                    for c,lines in enumerate(row)).rstrip())
+    result.append(rule)
+    return result
+
+# Lines of a table, printed by tabulate if not supported natively
+def table(rows, headers=True):
+    lines = native(rows, headers)
+    if lines is None:
+        from tabulate import tabulate
+        if headers:
+            lines = tabulate(rows, headers="firstrow", tablefmt="rst").splitlines()
+        else:
+            lines = tabulate(rows, tablefmt="rst").splitlines()
+    return lines
+
+# Random tables of strings, like the ones of SXLs, and integers
+def random_table(rnd):
+    words = ["type", "``integer``", "Signal group", "-Off |br|\n-On", " lead", "trail ",
+             "", " ", "A0001", "`S0001`_", "Reserved", "e.g.", "δ-value", "日本語",
+             "a\nb", "x\n", "\nx", "|br|", "Inf", "1,000", "12", "-3", "1.5", "True",
+             "a  b", "(Optional) set", "``Deprecated`` ok"]
+    values = words + [0, 1, 7, 42, -5, 65535, None, 1.5, True]
+    columns = rnd.randint(1, 5)
+    headers = rnd.random() < 0.8
+    table = []
+    if headers:
+        table.append([rnd.choice(["ObjectType", "Description", "Enum", "Name", "State-Bit", "",
+                                  "Priority"]) for c in range(columns)])
+    for r in range(rnd.randint(0, 6)):
+        row = []
+        for c in range(columns):
+            if rnd.random() < 0.3:
+                row.append(rnd.choice(values))
+            else:
+                row.append(rnd.choice(words[:20]) if c % 2 else rnd.choice([0, 3, 255, "", "x"]))
+        table.append(row)
+    return table, headers
+
+# Compare with tabulate on random tables. Returns the number that differ
+def check(count, seed):
+    from tabulate import tabulate
+
+    rnd = random.Random(seed)
+    differ = 0
+    handled = 0
+    for i in range(count):
+        rows, headers = random_table(rnd)
+        if not rows:
+            continue
+        lines = native(rows, headers)
+        if lines is None:
+            continue
+        handled += 1
+        if headers:
+            expected = tabulate(rows, headers="firstrow", tablefmt="rst")
+        else:
+            expected = tabulate(rows, tablefmt="rst")
+        if "\n".join(lines) != expected:
+            differ += 1
+            if differ <= 5:
+                print("Differs: " + repr(rows), file=sys.stderr)
+                print(expected, file=sys.stderr)
+                print("\n".join(lines), file=sys.stderr)
+    print(str(count) + " tables, " + str(handled) + " printed natively, " +
+          str(differ) + " differ")
+    return differ
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the rst tables with ' +
+        'tabulate on random tables')
+    parser.add_argument('--count', type=int, default=10000, help='Number of tables')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if check(args.count, args.seed):
+        sys.exit(1)
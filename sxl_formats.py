@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Renderers of an SXL model: rst, Markdown, HTML and json. Each renderer
+# walks the model once and writes the lines of the document to out.
+#
+# Descriptions are converted by the convert function given to the
+# renderer, from markdown to the pandoc format in TARGET. Renderers
+# without a TARGET don't convert descriptions
+
+import json
+import html
+import rst_table
+import sxl_model
+import sxl_text
+
+# Code types with their title, the header of their code id column, the
+# title of their arguments and the widths of the columns of their table
+CODE_TYPES = [
+    ('alarms', "Alarms", "alarmCodeId", "Return values", ["0.20", "0.10", "0.50", "0.10", "0.10"]),
+    ('statuses', "Status", "statusCodeId", "Return values", ["0.30", "0.10", "0.60"]),
+    ('commands', "Commands", "commandCodeId", "Arguments", ["0.30", "0.15", "0.20", "0.35"]),
+]
+
+VERSION_FIELDS = [
+    ("Plant Id", 'id'),
+    ("Plant Name", 'description'),
+    ("Constructor", 'constructor'),
+    ("Reviewed", 'reviewed'),
+    ("Approved", 'approved'),
+    ("Created date", 'created_date'),
+    ("SXL revision", 'revision'),
+    ("Revision date", 'date'),
+    ("RSMP version", 'rsmp_version'),
+]
+
+# Descriptions converted by the renderers, for converting them up front
+def descriptions(sxl):
+    texts = []
+    for object in sxl.objects:
+        for code_type, title, id_header, arguments_title, widths in CODE_TYPES:
+            for code in getattr(object, code_type):
+                if not code.reserved:
+                    texts.append(sxl_text.paragraphs(sxl_text.trim(code.description)))
+                elif code_type == 'alarms':
+                    texts.append(sxl_text.RESERVED)
+    return texts
+
+# The structure of the document, walked by every renderer but json.
+# Subclasses write the markup.
+#
+# The object types, the aggregated status, the tables of codes and the
+# details of each code are parts of the document, written by
+# part(subtree, name, *args), which calls the method name with args. The
+# subtree is the part of the model the part is written from. yaml2rst
+# gives a part function keeping the parts of the rst from one run to the
+# next, and rendering them in other processes
+class Markup:
+    TARGET = None
+
+    def __init__(self, out, convert, part=None):
+        self.out = out
+        self.convert = convert
+        self.render_part = part
+
+    def part(self, subtree, name, *args):
+        if self.render_part:
+            self.render_part(subtree, name, args)
+        else:
+            getattr(self, name)(*args)
+
+    def write(self, sxl, extended):
+        self.begin()
+        self.heading(1, "Signal Exchange List")
+        if extended:
+            self.fields([(self.bold(label) + ": " + self.text(str(getattr(sxl, name))))
+                         for label,name in VERSION_FIELDS if getattr(sxl, name) is not None])
+
+        objects = [(object.name, object.description, object.grouped) for object in sxl.objects]
+        self.part(('object_types', objects), 'object_types', objects)
+        grouped = [(object.name, object.aggregated_status, object.functional_position,
+                    object.functional_state) for object in sxl.objects if object.grouped]
+        self.part(('aggregated_status', grouped), 'aggregated_status', grouped)
+
+        for code_type, title, id_header, arguments_title, widths in CODE_TYPES:
+            self.codes(sxl, code_type, title, id_header, arguments_title, widths)
+        self.end()
+
+    # objects are the name, description and grouped of each object type
+    def object_types(self, objects):
+        self.heading(2, "Object Types")
+        for title, grouped in [("Grouped objects", True), ("Single objects", False)]:
+            self.heading(3, title)
+            self.table(["ObjectType", "Description"],
+                       [[self.text(name), self.text(description)]
+                        for name,description,object_grouped in objects
+                        if object_grouped == grouped],
+                       title, ["0.30", "0.50"])
+
+    # objects are the name, aggregated status, functional position and
+    # functional state of each grouped object type
+    def aggregated_status(self, objects):
+        self.heading(2, "Aggregated status")
+        rows = []
+        for name, states, functional_position, functional_state in objects:
+            comment = [""]
+            if not functional_position:
+                comment = ["functionalPosition not used (set to null)"]
+            if not functional_state:
+                comment.append("functionalState not used (set to null)")
+            rows.append([self.text(name),
+                         self.multiline("\n".join("-" + pos for pos in functional_position or ())),
+                         self.multiline("\n".join("-" + pos for pos in functional_state or ())),
+                         self.multiline("\n".join(comment))])
+        self.table(["ObjectType", "functionalPosition", "functionalState", "Description"], rows,
+                   "Aggregated status", ["0.20", "0.20", "0.20", "0.40"])
+
+        self.table(["State-Bit", "Description", "Comment"],
+                   [[self.text(state.id), self.text(state.title),
+                     self.text((state.description or "").replace("\n", " "))]
+                    for name,states,functional_position,functional_state in objects
+                    for state in states],
+                   "State bits", ["0.10", "0.30", "0.60"])
+
+    def codes(self, sxl, code_type, title, id_header, arguments_title, widths):
+        self.heading(2, title)
+        if code_type == 'statuses':
+            self.page_break()
+
+        owners = {}
+        rows = []
+        for object in sxl.objects:
+            for code in getattr(object, code_type):
+                owners.setdefault(code.id, []).append((object.name, code))
+                if code.reserved:
+                    description = self.code("Reserved")
+                else:
+                    description = self.text(sxl_text.summary(code.description))
+                row = [self.text(object.name), self.link(code.id)]
+                if code_type == 'commands':
+                    row.append(self.text(code.command))
+                row.append(description)
+                if code_type == 'alarms':
+                    row += [self.text(code.priority), self.text(code.category)]
+                rows.append((object.name, code, row))
+        rows.sort(key=lambda row: sxl_text.sort_cid(row[1].id))
+
+        headers = ["ObjectType", id_header, "Description"]
+        if code_type == 'commands':
+            headers = ["ObjectType", id_header, "Command", "Description"]
+        if code_type == 'alarms':
+            headers += ["Priority", "Category"]
+        table = [row for object_name,code,row in rows]
+        self.part(('table', [headers] + table), 'table', headers, table, title, widths)
+
+        # The details are written for each object type defining a code.
+        # Alarms only have their own description, statuses and commands
+        # the ones of every object type defining them
+        for object_name, code, row in rows:
+            described = [owner for owner_name,owner in owners[code.id]]
+            if code_type == 'alarms':
+                described = [code]
+            self.part((code_type, object_name, code.id, owners[code.id]), 'details',
+                      code_type, code, described, owners[code.id], arguments_title)
+
+    # Details of a code, with the descriptions of described and the
+    # arguments of owners, the object types defining the code id and
+    # their codes. Reserved alarms get the description "Reserved",
+    # reserved statuses and commands are marked as reserved
+    def details(self, code_type, code, described, owners, arguments_title):
+        self.code_heading(code_type, code.id)
+        self.paragraph("Available from SXL version: " + self.code(code.from_version))
+        for owner in described:
+            if owner.reserved and code_type != 'alarms':
+                self.paragraph(self.code("Reserved"))
+            else:
+                description = sxl_text.RESERVED if owner.reserved else owner.description
+                self.description(self.convert(sxl_text.paragraphs(sxl_text.trim(description))))
+
+        for owner_name, owner in owners:
+            if owner.arguments is not None:
+                self.caption(self.bold(arguments_title))
+                for argument in owner.arguments:
+                    self.argument(argument.name, argument, owner.reserved)
+
+    # Comment of an argument or array item
+    def comment(self, argument, reserved):
+        if reserved:
+            return self.code("Reserved")
+        if argument.description is None:
+            return ""
+        comment = self.multiline(sxl_text.trim(argument.description.rstrip("\n")))
+        if argument.optional:
+            comment = "(Optional) " + comment
+        if argument.deprecated:
+            comment = self.code("Deprecated") + " " + comment
+        return comment
+
+    # An argument or return value.
+    # Items of arrays are only written at the top level
+    def argument(self, name, argument, reserved, items=True):
+        self.argument_heading(name, self.comment(argument, reserved))
+
+        rows = [[self.text("type"), self.code(argument.type)]]
+        array = ()
+        if argument.values is None:
+            if argument.type == "array":
+                if argument.items is not None and items:
+                    array = argument.items
+            elif argument.type in ["integer", "long", "float", "integer_as_string"]:
+                if argument.max is not None and argument.max != "":
+                    rows.append([self.text("max"), self.code(str(argument.max))])
+                if argument.min is not None and argument.min != "":
+                    rows.append([self.text("min"), self.code(str(argument.min))])
+        self.table(None, rows)
+
+        if argument.values:
+            self.table(["Enum", "Description"],
+                       [[self.text(value.name), self.text(value.description)]
+                        for value in argument.values])
+
+        if argument.type == "array":
+            self.table(["Name", "Description"],
+                       [[self.text(item.name), self.comment(item, reserved)] for item in array])
+            for item in array:
+                self.argument(name + ": " + item.name, item, reserved, items=False)
+
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+    def page_break(self):
+        pass
+
+    # Text whose lines are kept apart
+    def multiline(self, text):
+        return self.text(text)
+
+    def code_heading(self, code_type, code_id):
+        self.heading(3, code_id, code_id)
+
+    # Line introducing the arguments of a code
+    def caption(self, text):
+        self.paragraph(text)
+
+    def argument_heading(self, name, comment):
+        self.paragraph(self.code(name))
+        if comment:
+            self.paragraph(comment)
+
+# reStructuredText, as published in the RSMP specification. Values in
+# tables are given as they are, so rst_table aligns numbers. Tables with
+# a label are numbered tables of the document, the others the tables of
+# the arguments
+class Rst(Markup):
+    EXTENSION = ".rst"
+    TARGET = "rst"
+
+    UNDERLINES = {1: "=", 2: "-", 3: "^"}
+
+    # The underline of the headings of the details, whatever the length
+    # of the code id
+    CODE_UNDERLINES = {'alarms': "^^^^^", 'statuses': "^^^^^^^^", 'commands': "^^^^^"}
+
+    def text(self, text):
+        return text
+
+    def code(self, text):
+        return "``" + text + "``"
+
+    def bold(self, text):
+        return "**" + text + "**"
+
+    def link(self, code_id):
+        return "`" + code_id + "`_"
+
+    # Lines should never start with whitespace
+    def multiline(self, text):
+        return text.replace("\n", " |br|\n").replace("\n |br|", "\n|br|")
+
+    def heading(self, level, text, anchor=None):
+        if level > 1:
+            self.out.line()
+        self.out.line(text)
+        self.out.line(self.UNDERLINES[level] * len(text))
+
+    def code_heading(self, code_type, code_id):
+        self.out.line()
+        self.out.line(code_id)
+        self.out.line(self.CODE_UNDERLINES[code_type])
+        self.out.line()
+
+    def paragraph(self, text):
+        self.out.line(text)
+        self.out.line()
+
+    def description(self, text):
+        self.out.line(text)
+        self.out.line()
+
+    def caption(self, text):
+        self.out.line(text)
+
+    def argument_heading(self, name, comment):
+        self.out.line()
+        self.out.line(name)
+        self.out.line()
+        self.out.lines(comment, '    ')
+
+    def fields(self, fields):
+        for field in fields:
+            self.out.line("+ " + field)
+
+    def page_break(self):
+        self.out.line()
+        self.out.line(".. raw:: latex")
+        self.out.line()
+        self.out.line("    \\newpage")
+        self.out.line()
+
+    def start_table(self, widths, label):
+        self.out.line()
+        self.out.line(".. tabularcolumns:: " + "".join("|\\Yl{" + width + "}" for width in widths) + "|")
+        self.out.line()
+        self.out.line(".. table:: " + label)
+        self.out.line("   :class: longtable")
+        self.out.line()
+        self.out.line()
+
+    # Print a table, the first row being the header if headers is set
+    def print_table(self, table, indent, headers=True):
+        for line in rst_table.table(table, headers):
+            self.out.line(indent + line)
+
+    def table(self, headers, rows, label=None, widths=None):
+        if label is None:
+            self.out.line()
+            if headers:
+                self.print_table([headers] + rows, '    ')
+            else:
+                self.print_table(rows, '    ', headers=False)
+        else:
+            self.start_table(widths, label)
+            self.print_table([headers] + rows, '   ')
+            self.out.line()
+
+    def end(self):
+        self.out.line()
+        self.out.line(".. |br| replace:: |br_html| |br_latex|")
+        self.out.line()
+        self.out.line(".. |br_html| raw:: html")
+        self.out.line()
+        self.out.line("   <br>")
+        self.out.line()
+        self.out.line(".. |br_latex| raw:: latex")
+        self.out.line()
+        self.out.line("   \\newline")
+        self.out.line()
+
+# GitHub flavoured Markdown. Descriptions are already markdown
+class Markdown(Markup):
+    EXTENSION = ".md"
+
+    # Numbers are given as they are, and missing descriptions as None
+    def text(self, text):
+        if text is None:
+            return ""
+        return str(text)
+
+    def code(self, text):
+        return "`" + text + "`"
+
+    def bold(self, text):
+        return "**" + text + "**"
+
+    # GitHub makes the anchors of headings lower case
+    def link(self, code_id):
+        return "[" + code_id + "](#" + code_id.lower() + ")"
+
+    def heading(self, level, text, anchor=None):
+        self.out.line("#" * level + " " + text)
+        self.out.line()
+
+    # Lines of a paragraph are kept apart by line breaks
+    def paragraph(self, text):
+        self.out.lines("<br>\n".join(text.splitlines()), "")
+        self.out.line()
+
+    def description(self, text):
+        for line in text.strip("\n").splitlines():
+            self.out.line(line)
+        self.out.line()
+
+    def fields(self, fields):
+        for field in fields:
+            self.out.line("- " + field)
+        self.out.line()
+
+    def cell(self, text):
+        return text.replace("|", "\\|").replace("\n", "<br>")
+
+    # Tables without headers get an empty header
+    def table(self, headers, rows, label=None, widths=None):
+        columns = len(headers or rows[0])
+        self.out.line("| " + " | ".join(self.cell(header) for header in headers or [""] * columns) + " |")
+        self.out.line("|" + " --- |" * columns)
+        for row in rows:
+            self.out.line("| " + " | ".join(self.cell(cell) for cell in row) + " |")
+        self.out.line()
+
+# A complete HTML document. Descriptions are converted with pandoc
+class Html(Markup):
+    EXTENSION = ".html"
+    TARGET = "html"
+
+    def text(self, text):
+        if text is None:
+            return ""
+        return html.escape(str(text)).replace("\n", "<br>\n")
+
+    def code(self, text):
+        return "<code>" + html.escape(text) + "</code>"
+
+    def bold(self, text):
+        return "<strong>" + html.escape(text) + "</strong>"
+
+    def link(self, code_id):
+        return '<a href="#' + html.escape(code_id) + '">' + html.escape(code_id) + '</a>'
+
+    def begin(self):
+        self.out.line("<!DOCTYPE html>")
+        self.out.line('<html>')
+        self.out.line('<head>')
+        self.out.line('<meta charset="utf-8">')
+        self.out.line("<title>Signal Exchange List</title>")
+        self.out.line('</head>')
+        self.out.line('<body>')
+
+    def end(self):
+        self.out.line('</body>')
+        self.out.line('</html>')
+
+    def heading(self, level, text, anchor=None):
+        tag = "h" + str(level)
+        if anchor:
+            self.out.line("<" + tag + ' id="' + html.escape(anchor) + '">' + html.escape(text) +
+                          "</" + tag + ">")
+        else:
+            self.out.line("<" + tag + ">" + html.escape(text) + "</" + tag + ">")
+
+    def paragraph(self, text):
+        self.out.lines("<p>" + text + "</p>", "")
+
+    def description(self, text):
+        self.out.lines(text, "")
+
+    def fields(self, fields):
+        self.out.line("<ul>")
+        for field in fields:
+            self.out.line("<li>" + field + "</li>")
+        self.out.line("</ul>")
+
+    def table(self, headers, rows, label=None, widths=None):
+        self.out.line("<table>")
+        if headers:
+            self.out.line("<thead>")
+            self.out.line("<tr>" + "".join("<th>" + html.escape(header) + "</th>"
+                                           for header in headers) + "</tr>")
+            self.out.line("</thead>")
+        self.out.line("<tbody>")
+        for row in rows:
+            self.out.lines("<tr>" + "".join("<td>" + cell + "</td>" for cell in row) + "</tr>", "")
+        self.out.line("</tbody>")
+        self.out.line("</table>")
+
+# The model in json, with the descriptions in markdown as in the yaml
+class Json:
+    EXTENSION = ".json"
+    TARGET = None
+
+    def __init__(self, out, convert):
+        self.out = out
+
+    # Dates and other values json doesn't have are written as strings
+    def write(self, sxl, extended):
+        self.out.lines(json.dumps(sxl_model.plain(sxl), indent=2, ensure_ascii=False, default=str), "")
+
+RENDERERS = {
+    'rst': Rst,
+    'markdown': Markdown,
+    'html': Html,
+    'json': Json,
+}
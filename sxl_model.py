@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Model of an SXL, built once from the yaml tree
+#
+# Objects of the model are read-only and use __slots__, and identifiers
+# like code ids, argument names and type names are interned, so that many
+# loaded SXLs share them. Collections are tuples in the order of the yaml.
+
+import sys
+import hashlib
+
+def intern(value):
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+class Model:
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__ + " is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(type(self).__name__ + " is read-only")
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, name) for name in self.FIELDS))
+
+    # Shows every field, so equal models have equal representations
+    def __repr__(self):
+        return type(self).__name__ + "(" + ", ".join(
+            name + "=" + repr(getattr(self, name)) for name in self.FIELDS) + ")"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.FIELDS))
+
+# A min or max given as null in the yaml, printed as None like yaml2rst
+# always has. A min or max that isn't given at all is None
+class Null:
+    __slots__ = ()
+
+    def __str__(self):
+        return "None"
+
+    def __repr__(self):
+        return "NULL"
+
+    # Unpickled as the same object
+    def __reduce__(self):
+        return "NULL"
+
+NULL = Null()
+
+class EnumValue(Model):
+    __slots__ = FIELDS = ('name', 'description')
+
+# An argument of an alarm or command, or a return value of a status.
+# min, max, values and items are None if not given, and min and max are
+# NULL if given as null. values are the EnumValues, empty if the values
+# are neither a mapping nor a list
+class Argument(Model):
+    __slots__ = FIELDS = ('name', 'type', 'description', 'optional', 'deprecated',
+                          'min', 'max', 'values', 'items')
+
+# An item of an array argument
+class ArrayItem(Argument):
+    __slots__ = ()
+
+class Alarm(Model):
+    __slots__ = FIELDS = ('id', 'description', 'reserved', 'priority', 'category',
+                          'from_version', 'arguments')
+
+class Status(Model):
+    __slots__ = FIELDS = ('id', 'description', 'reserved', 'from_version', 'arguments')
+
+class Command(Model):
+    __slots__ = FIELDS = ('id', 'description', 'reserved', 'command', 'from_version',
+                          'arguments')
+
+# A bit of the aggregated status
+class StateBit(Model):
+    __slots__ = FIELDS = ('id', 'title', 'description')
+
+# grouped is set if the object type has an aggregated status.
+# functional_position and functional_state are None if not used
+class ObjectType(Model):
+    __slots__ = FIELDS = ('name', 'description', 'grouped', 'aggregated_status',
+                          'functional_position', 'functional_state',
+                          'alarms', 'statuses', 'commands')
+
+# The SXL revision is only given if version-date is given, and the RSMP
+# version only if rsmp_version is given, like yaml2rst always has
+class SXL(Model):
+    __slots__ = FIELDS = ('id', 'description', 'constructor', 'reviewed', 'approved',
+                          'created_date', 'revision', 'date', 'rsmp_version', 'objects')
+
+def enum_values(values):
+    if type(values) is dict:
+        return tuple(EnumValue(intern(name), description) for name,description in values.items())
+    if type(values) is list:
+        return tuple(EnumValue(intern(name), "") for name in values)
+    return ()
+
+# A min or max of an argument
+def limit(arg, name):
+    value = arg.get(name)
+    if value is None and name in arg:
+        return NULL
+    return value
+
+def argument(name, arg, cls=Argument):
+    values = None
+    if "values" in arg:
+        values = enum_values(arg['values'])
+    items = None
+    if "items" in arg:
+        items = tuple(argument(item_name, item, ArrayItem)
+                      for item_name,item in arg['items'].items())
+    return cls(intern(name),
+               intern(arg['type']),
+               arg.get('description'),
+               arg.get('optional') is True,
+               arg.get('deprecated') is True,
+               limit(arg, 'min'),
+               limit(arg, 'max'),
+               values,
+               items)
+
+def arguments(code):
+    if "arguments" not in code:
+        return None
+    return tuple(argument(name, arg) for name,arg in code['arguments'].items())
+
+def reserved(code):
+    return code.get('reserved') is True
+
+def functional(values):
+    if type(values) is list:
+        return tuple(intern(value) for value in values)
+    return None
+
+def object_type(name, object):
+    states = ()
+    if "aggregated_status" in object:
+        states = tuple(StateBit(intern(state_id), state['title'], state.get('description'))
+                       for state_id,state in object['aggregated_status'].items())
+    return ObjectType(
+        intern(name),
+        object['description'],
+        "aggregated_status" in object,
+        states,
+        functional(object.get('functional_position')),
+        functional(object.get('functional_state')),
+        tuple(Alarm(intern(alarm_id), alarm['description'], reserved(alarm),
+                    alarm['priority'], intern(alarm['category']),
+                    intern(alarm['from_version']), arguments(alarm))
+              for alarm_id,alarm in object['alarms'].items()),
+        tuple(Status(intern(status_id), status['description'], reserved(status),
+                     intern(status['from_version']), arguments(status))
+              for status_id,status in object['statuses'].items()),
+        tuple(Command(intern(command_id), command['description'], reserved(command),
+                      intern(command['command']), intern(command['from_version']),
+                      arguments(command))
+              for command_id,command in object['commands'].items()))
+
+# Build the model of an SXL from its yaml tree
+def build(yaml_sxl):
+    return SXL(
+        yaml_sxl.get('id'),
+        yaml_sxl.get('description'),
+        yaml_sxl.get('constructor'),
+        yaml_sxl.get('reviewed'),
+        yaml_sxl.get('approved'),
+        yaml_sxl.get('created-date'),
+        yaml_sxl.get('version') if "version-date" in yaml_sxl else None,
+        yaml_sxl.get('date'),
+        yaml_sxl.get('rsmp-version') if "rsmp_version" in yaml_sxl else None,
+        tuple(object_type(name, object) for name,object in yaml_sxl['objects'].items()))
+
+# Digest of a subtree of the model, for telling unchanged parts apart.
+# repr() keeps the order of mappings and tells e.g. 1 from "1"
+def digest(subtree):
+    return hashlib.sha256(repr(subtree).encode('utf-8')).hexdigest()
+
+# A model as plain dicts, lists and values, e.g. for json. A min or max
+# given as null becomes None
+def plain(value):
+    if value is NULL:
+        return None
+    if isinstance(value, Model):
+        return {name: plain(getattr(value, name)) for name in value.FIELDS}
+    if type(value) is tuple:
+        return [plain(item) for item in value]
+    return value
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Text of the descriptions and code ids of an SXL, as printed by every
+# format of yaml2rst and sxl_formats. Kept apart from the renderers, so
+# yaml2rst can import it without slowing down its startup
+
+# The description of a reserved alarm, in markdown
+RESERVED = "``Reserved``"
+
+# Order of the codes in the tables, by the number of their code id
+def sort_cid(code_id):
+    return code_id.translate({ord(i): None for i in 'ASM`_'})
+
+# A description without the trailing "." of its first line
+def trim(description):
+    lines = description.split("\n")
+    lines[0] = lines[0].rstrip(".")
+    return "\n".join(lines)
+
+# First line of a description, without a trailing "."
+def summary(description):
+    lines = trim(description).splitlines()
+    if not lines:
+        return ""
+    return lines[0]
+
+# A description with its first line as a paragraph of its own
+def paragraphs(description):
+    lines = description.split("\n")
+    if len(lines) > 1 and lines[1] != "":
+        lines.insert(1, "")
+    return "\n".join(lines)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Loads and writes SXLs in yaml format
+#
+# SXLs use values like On/Off and Yes/No as plain strings, e.g. as enum
+# values, so they must not be converted into True/False. The loaders here
+# carry their own resolvers without those booleans, leaving PyYAML's global
+# resolvers untouched. libyaml is used when available.
+#
+# Run as a script to check that the libyaml and pure python loaders give the
+# same result for one or more SXLs.
+
+import sys
+import argparse
+import yaml
+
+BOOL_TAG = 'tag:yaml.org,2002:bool'
+
+# Copy of implicit resolvers without the On/Off/Yes/No booleans.
+# true/false are still booleans
+def without_yes_no(resolvers):
+    copy = {}
+    for ch, entries in resolvers.items():
+        if ch in "OoYyNn":
+            entries = [x for x in entries if x[0] != BOOL_TAG]
+        if entries:
+            copy[ch] = list(entries)
+    return copy
+
+class SXLSafeLoader(yaml.SafeLoader):
+    yaml_implicit_resolvers = without_yes_no(yaml.SafeLoader.yaml_implicit_resolvers)
+
+if yaml.__with_libyaml__:
+    class SXLLoader(yaml.CSafeLoader):
+        yaml_implicit_resolvers = without_yes_no(yaml.CSafeLoader.yaml_implicit_resolvers)
+else:
+    SXLLoader = SXLSafeLoader
+
+# Load an SXL from a string or stream
+def load(stream, loader=SXLLoader):
+    return yaml.load(stream, Loader=loader)
+
+def load_file(path, loader=SXLLoader):
+    with open(path, 'rb') as f:
+        return load(f, loader)
+
+# Multiline strings are written as literal blocks, like ruby does.
+# libyaml is used when available
+class SXLDumper(getattr(yaml, 'CSafeDumper', yaml.SafeDumper)):
+    def represent_str(self, data):
+        if "\n" in data:
+            return self.represent_scalar('tag:yaml.org,2002:str', data, style='|')
+        return self.represent_scalar('tag:yaml.org,2002:str', data)
+
+SXLDumper.add_representer(str, SXLDumper.represent_str)
+
+# Write an SXL, or a part of it, in yaml to a stream. Keys are kept in order
+def dump(data, out, explicit_start=True):
+    yaml.dump(data, out, Dumper=SXLDumper, sort_keys=False, allow_unicode=True,
+              explicit_start=explicit_start, default_flow_style=False)
+
+# Check that the libyaml and pure python loaders give the same result for
+# yaml in a string or bytes
+def loaders_agree(data):
+    return load(data, SXLLoader) == load(data, SXLSafeLoader)
+
+# Check that the libyaml and pure python loaders give identical trees.
+# Returns the number of files that differ
+def check(paths):
+    differ = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            same = loaders_agree(f.read())
+        if not same:
+            differ += 1
+        print(path + ": " + ("identical" if same else "differ"))
+    return differ
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check that the libyaml ' +
+        'and pure python loaders give the same result for SXLs in yaml')
+    parser.add_argument('yaml', nargs='+', help='SXL in yaml format')
+    args = parser.parse_args()
+
+    if not yaml.__with_libyaml__:
+        print("Warning: libyaml not available, only the pure python loader is used",
+              file=sys.stderr)
+    if check(args.yaml):
+        sys.exit(1)
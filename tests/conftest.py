@@ -0,0 +1,9 @@
+# The tools are scripts in the root of the repo, and the generator of
+# synthetic SXLs is in benchmarks/, so both are put on the path of the tests
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
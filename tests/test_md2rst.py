@@ -0,0 +1,66 @@
+# The built-in markdown converter of md2rst must give the same result as
+# pandoc for every description it supports. Skipped if pypandoc or pandoc
+# is missing
+
+import os
+import argparse
+import pytest
+
+pypandoc = pytest.importorskip("pypandoc")
+try:
+    pypandoc.get_pandoc_version()
+except OSError:
+    pytest.skip("pandoc is not available", allow_module_level=True)
+
+import md2rst
+import sxl_yaml
+import generate_sxl
+
+SXL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sxl.yaml")
+
+# Descriptions like the ones of SXLs, with the markdown the built-in
+# converter supports and some near the edges of what it supports
+DESCRIPTIONS = [
+    "Serious hardware error.",
+    "Controller starting\nThe controller is starting up.",
+    "Signal group status\n\nThe status of each signal group, see `sg`.",
+    "Use *emphasis*, **strong** and ``double ticks`` in text.",
+    "- First item\n- Second item\n- Third item",
+    "Values:\n\n- `0`: off\n- `1`: on, e.g. when active",
+    "Loose list\n\n* one\n\n* two\n\n* three",
+    "See [RSMP](https://rsmp-nordic.org/specification) for details.",
+    "Words with apostrophes like it's and under_scores and AT&T.",
+    "Unicode: grön våg, åäö and ÅÄÖ.",
+    "Numbers 1. inside a line and 2) too.",
+    "1. First\n2. Second",
+    "Line with trailing spaces  \nnext line",
+    "Heading\n=======",
+    "# Header",
+    "> Quote",
+    "    indented code",
+    "Text with (parentheses) and a - dash, 50% and a/b = c+d.",
+    " ".join(["A long description wrapped over several lines."] * 12),
+    "Mr. Smith e.g. i.e. etc. abbreviations",
+    "Two...dots and -- dashes",
+    "*emphasis*text and `code`s",
+]
+
+def generated_descriptions():
+    parser = argparse.ArgumentParser()
+    generate_sxl.add_arguments(parser)
+    options = parser.parse_args(["--description-length", "60"])
+    return list(md2rst.descriptions(generate_sxl.generate(options)))
+
+def assert_same(texts):
+    supported, differences = md2rst.compare(texts)
+    assert supported > 0
+    assert differences == []
+
+def test_descriptions():
+    assert_same(DESCRIPTIONS)
+
+def test_generated_descriptions():
+    assert_same(generated_descriptions())
+
+def test_sxl_descriptions():
+    assert_same(md2rst.descriptions(sxl_yaml.load_file(SXL)))
@@ -0,0 +1,86 @@
+# The libyaml loader of sxl_yaml must give the same result as the pure
+# python loader. Skipped if PyYAML is built without libyaml
+
+import os
+import glob
+import argparse
+import pytest
+
+yaml = pytest.importorskip("yaml")
+
+import sxl_yaml
+import generate_sxl
+
+pytestmark = pytest.mark.skipif(not yaml.__with_libyaml__, reason="libyaml is not available")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scalars a loader could resolve differently: booleans, numbers, dates,
+# nulls, multi-line strings and anchors
+SCALARS = """
+objects:
+  Traffic Light Controller:
+    description: "Traffic light controller"
+    statuses:
+      S0001:
+        description: |-
+          Signal group status.
+          Second line with *emphasis*
+        arguments:
+          status:
+            type: string
+            values:
+              On: Switched on
+              Off: Switched off
+              Yes: Confirmed
+              No: Not confirmed
+              y: Short yes
+              n: Short no
+          enabled: &enabled
+            type: boolean
+            default: true
+            off: false
+          copy: *enabled
+          limits:
+            min: 0x10
+            max: 1_000
+            step: 0.5
+            scale: 1e3
+            none: null
+            tilde: ~
+            inf: .inf
+            nan: .nan
+            octal: 0o17
+            leading: 007
+            time: 12:30:45
+          dates:
+            date: 2020-01-31
+            timestamp: 2020-01-31T12:30:45Z
+            version: 1.0.15
+          text: >
+            Folded text
+            over two lines
+          unicode: "Grön våg \\u00e5"
+"""
+
+def generated_sxl():
+    parser = argparse.ArgumentParser()
+    generate_sxl.add_arguments(parser)
+    return yaml.safe_dump(generate_sxl.generate(parser.parse_args([])), sort_keys=False,
+                          allow_unicode=True)
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(ROOT, "tlc", "*.yaml"))))
+def test_sxl_files(path):
+    with open(path, 'rb') as f:
+        assert sxl_yaml.loaders_agree(f.read())
+
+def test_generated_sxl():
+    assert sxl_yaml.loaders_agree(generated_sxl())
+
+def test_scalars():
+    assert sxl_yaml.loaders_agree(SCALARS)
+
+    # On/Off/Yes/No are kept as strings, true/false are booleans
+    status = sxl_yaml.load(SCALARS)['objects']['Traffic Light Controller']['statuses']['S0001']
+    assert list(status['arguments']['status']['values']) == ["On", "Off", "Yes", "No", "y", "n"]
+    assert status['arguments']['enabled']['default'] is True
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Reads SXL in Excel format and outputs to yaml format, like xlsx2yaml.rb.
+#
+# The sheets are parsed as a stream straight from the zip file, a row at a
+# time, so the workbook is never loaded as a whole and there is no limit on
+# the number of rows. Shared strings are only parsed as far as the cells of
+# a sheet need them. The sheets are parsed by a pool of processes, and the
+# results are put together in the order of the sheets, like xlsx2yaml.rb
+# does.
+#
+# The result is the same as the one of xlsx2yaml.rb, except where
+# xlsx2yaml.rb doesn't follow the layout of the template and the README:
+# Approved is read from B15, the "Manouver" section of the commands is read,
+# and the optional object of an alarm is put among the alarms of the site
+
+import os
+import re
+import io
+import sys
+import datetime
+import argparse
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+import sxl_yaml
+
+MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELATIONSHIPS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_RELATIONSHIPS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+CELL = re.compile(r"([A-Z]+)([0-9]+)")
+
+# Number formats of dates built into Excel
+DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+
+# Sheets with a meaning of their own. Other sheets are Objects sheets
+SHEETS = ["Version", "Object types", "Alarms", "Aggregated status", "Aggregerad status",
+          "Status", "Commands"]
+
+COMMAND_SECTIONS = ["Functional position", "Functional state", "Maneuver", "Manouver",
+                    "Parameter"]
+
+# Column number of a cell reference like "AB12"
+def column(reference):
+    col = 0
+    for letter in CELL.match(reference).group(1):
+        col = col * 26 + ord(letter) - ord('A') + 1
+    return col - 1
+
+# Path of a target of a relationship, relative to the part it is from
+def part_path(base, target):
+    if target.startswith("/"):
+        return target[1:]
+    parts = base.split("/")[:-1]
+    for part in target.split("/"):
+        if part == "..":
+            parts.pop()
+        elif part != ".":
+            parts.append(part)
+    return "/".join(parts)
+
+def relationships(zip, part):
+    path = part_path(part, "_rels/" + part.split("/")[-1] + ".rels")
+    if path not in zip.namelist():
+        return {}
+    root = ET.fromstring(zip.read(path))
+    return {rel.get('Id'): (rel.get('Type').split("/")[-1], part_path(part, rel.get('Target')))
+            for rel in root.iter(PACKAGE_RELATIONSHIPS + "Relationship")}
+
+# Text of a shared or inline string, without phonetic runs
+def string_text(element):
+    text = []
+    for child in element:
+        if child.tag == MAIN + "t":
+            text.append(child.text or "")
+        elif child.tag == MAIN + "r":
+            for t in child.iter(MAIN + "t"):
+                text.append(t.text or "")
+    return "".join(text)
+
+# The shared strings of a workbook, parsed when a cell needs them.
+# Strings are parsed up to the last one asked for
+class SharedStrings:
+    def __init__(self, zip, path):
+        self.strings = []
+        self.events = None
+        if path in zip.namelist():
+            self.events = ET.iterparse(zip.open(path), events=('start', 'end'))
+
+    def get(self, index):
+        while index >= len(self.strings) and self.events:
+            try:
+                event, element = next(self.events)
+            except StopIteration:
+                self.events = None
+                break
+            if event == 'start' and element.tag == MAIN + "sst":
+                self.root = element
+            elif event == 'end' and element.tag == MAIN + "si":
+                self.strings.append(string_text(element))
+                self.root.clear()
+        if index < len(self.strings):
+            return self.strings[index]
+        return None
+
+# Styles of cells with dates
+def date_styles(zip, path):
+    if path not in zip.namelist():
+        return set()
+    root = ET.fromstring(zip.read(path))
+    formats = set(DATE_FORMATS)
+    for format in root.iter(MAIN + "numFmt"):
+        # Formats with days, months or years outside of quotes and brackets
+        code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', "", format.get('formatCode', ""))
+        if re.search("[dmy]", code, re.IGNORECASE):
+            formats.add(int(format.get('numFmtId')))
+    styles = set()
+    cell_formats = root.find(MAIN + "cellXfs")
+    if cell_formats is not None:
+        for style, xf in enumerate(cell_formats.findall(MAIN + "xf")):
+            if int(xf.get('numFmtId', 0)) in formats:
+                styles.add(style)
+    return styles
+
+# A workbook read from a file or from the bytes of one
+class Workbook:
+    def __init__(self, file):
+        self.zip = zipfile.ZipFile(file)
+        part = "xl/workbook.xml"
+        for type, path in relationships(self.zip, "").values():
+            if type == "officeDocument":
+                part = path
+        root = ET.fromstring(self.zip.read(part))
+        rels = relationships(self.zip, part)
+
+        self.sheets = []
+        for sheet in root.iter(MAIN + "sheet"):
+            self.sheets.append((sheet.get('name'), rels[sheet.get(RELATIONSHIPS + "id")][1]))
+
+        self.epoch = datetime.datetime(1899, 12, 30)
+        properties = root.find(MAIN + "workbookPr")
+        if properties is not None and properties.get('date1904') in ("1", "true"):
+            self.epoch = datetime.datetime(1904, 1, 1)
+
+        paths = {type: path for type, path in rels.values()}
+        self.strings = SharedStrings(self.zip, paths.get('sharedStrings'))
+        self.dates = date_styles(self.zip, paths.get('styles'))
+
+    def number(self, text, style):
+        if re.match(r"^-?[0-9]+$", text):
+            value = int(text)
+        else:
+            value = float(text)
+        if style in self.dates:
+            date = self.epoch + datetime.timedelta(days=value)
+            if date.time() == datetime.time():
+                return date.date()
+            return date
+        return value
+
+    def value(self, cell):
+        type = cell.get('t')
+        if type == "inlineStr":
+            element = cell.find(MAIN + "is")
+            return string_text(element) if element is not None else None
+        v = cell.find(MAIN + "v")
+        if v is None or v.text is None:
+            return None
+        if type == "s":
+            return self.strings.get(int(v.text))
+        if type == "b":
+            return v.text == "1"
+        if type in ("str", "e"):
+            return v.text
+        return self.number(v.text, int(cell.get('s', 0)))
+
+    # The rows of a sheet as (row number, {column: value}), from row 0.
+    # Rows without cells are left out. Cells without a value are None
+    def rows(self, path):
+        y = -1
+        with self.zip.open(path) as f:
+            for event, element in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if element.tag == MAIN + "sheetData":
+                        data = element
+                    continue
+                if element.tag != MAIN + "row":
+                    continue
+                y = int(element.get('r', y + 2)) - 1
+                cells = {}
+                x = -1
+                for cell in element.iter(MAIN + "c"):
+                    x = column(cell.get('r')) if cell.get('r') else x + 1
+                    cells[x] = self.value(cell)
+                data.clear()
+                yield y, cells
+
+# Helpers with the behaviour of the ruby methods used by xlsx2yaml.rb
+
+# String#split, which drops empty strings at the end
+def split(text, separator):
+    parts = text.split(separator)
+    while parts and parts[-1] == "":
+        parts.pop()
+    return parts
+
+# String#chomp
+def chomp(text):
+    if type(text) is not str:
+        return text
+    if text.endswith("\r\n"):
+        return text[:-2]
+    if text.endswith("\n") or text.endswith("\r"):
+        return text[:-1]
+    return text
+
+# String#to_i, Integer#to_i and nil.to_i
+def to_i(value):
+    if value is None:
+        return 0
+    if type(value) is not str:
+        return int(value)
+    match = re.match(r"\s*([+-]?[0-9]+(?:_[0-9]+)*)", value)
+    if match:
+        return int(match.group(1).replace("_", ""))
+    return 0
+
+# Integer(value), or the value itself if it isn't an integer
+def to_integer(value):
+    if type(value) is int or type(value) is float:
+        return int(value)
+    if type(value) is not str:
+        return value
+    text = value.strip().replace("_", "")
+    try:
+        if re.match(r"^[+-]?0[0-7]+$", text):
+            return int(text, 8)
+        return int(text, 0)
+    except ValueError:
+        return value
+
+def to_s(value):
+    if value is True or value is False:
+        return str(value).lower()
+    return str(value)
+
+# Empty like String#empty?, nil is not empty
+def empty(value):
+    return value == ""
+
+# Value of "key: value" in a description, and the description without it
+def get_value(field, key):
+    if field is None:
+        return None, field
+    for pair in split(field, "\n"):
+        parts = split(pair, ": ")
+        if len(parts) < 2:
+            continue
+        if parts[0] == key:
+            field = field.replace(parts[0] + ": " + parts[1], "")
+            while chomp(field) != field:
+                field = chomp(field)
+            return parts[1], field
+    return None, field
+
+def add_rv_value(dest, value, description):
+    dest.setdefault('values', {})[to_s(to_integer(value))] = description or ""
+
+# The values of an argument or return value, given as "-value" lines with
+# the descriptions of the values in the description, or as "[min-max]"
+def add_values(dest, values):
+    if type(values) is str and values.startswith("-"):
+        values = split(values, "-")
+        values.pop(0)
+        for value in values:
+            value = value.replace("\n", "")
+            description, dest['description'] = get_value(dest['description'], value)
+            add_rv_value(dest, value, description)
+    elif dest['type'] in ('integer', 'long', 'real'):
+        values = split(to_s(values or "").replace("[", "").replace("]", ""), "-")
+        dest['min'] = to_i(values[0] if values else None)
+        dest['max'] = to_i(values[1] if len(values) > 1 else None)
+
+def remove_empty_description(dest):
+    if empty(dest['description']):
+        del dest['description']
+
+# Reading of a section of rows from first_row, until a row is missing or
+# has no value in the first column. parse makes a record of each row,
+# or None to skip it
+class Section:
+    def __init__(self, first_row, parse):
+        self.next_row = first_row
+        self.parse = parse
+        self.records = []
+        self.done = False
+
+    def row(self, y, cells):
+        if self.done or y < self.next_row:
+            return
+        if y > self.next_row or cells.get(0) is None:
+            self.done = True
+            return
+        record = self.parse(cells)
+        if record is not None:
+            self.records.append(record)
+        self.next_row += 1
+
+# A section starting two rows below the first row from row 4 with one of
+# titles in the first column
+class TitledSection:
+    def __init__(self, titles, parse):
+        self.titles = titles
+        self.parse = parse
+        self.section = None
+
+    def row(self, y, cells):
+        if self.section:
+            self.section.row(y, cells)
+        elif y >= 4 and cells.get(0) in self.titles:
+            self.section = Section(y + 2, self.parse)
+
+    def records(self):
+        return self.section.records if self.section else []
+
+# An object of an Objects sheet, or an object type of the Object types
+# sheet, up to the first missing cell
+def get_object(cells):
+    object = []
+    for x in range(6):
+        if x not in cells:
+            break
+        object.append(cells[x])
+    return object + [None] * (6 - len(object))
+
+def object_section(records):
+    objects = {}
+    for object in records:
+        key = object[0]
+        if key not in objects and object[2] is None:
+            objects[key] = {'description': object[1]}
+            continue
+        values = {'componentId': object[2], 'ntsObjectId': object[3]}
+        if object[4] is not None:
+            values['externalNtsId'] = to_integer(object[4])
+        if object[5] is not None:
+            values['description'] = object[5]
+        objects.setdefault(key, {})[object[1]] = values
+    return objects
+
+def alarm_row(cells):
+    if any(x not in cells for x in range(8)):
+        return None
+    a = [cells[x] for x in range(8)]
+
+    rv = {}
+    x = 8
+    while cells.get(x) is not None:
+        name = cells[x]
+        rv[name] = {'type': cells.get(x + 1), 'description': chomp(cells.get(x + 3))}
+        if rv[name]['type'] != 'boolean':
+            add_values(rv[name], cells.get(x + 2))
+        remove_empty_description(rv[name])
+        x += 4
+
+    alarm = {'description': a[3], 'priority': to_i(a[6]), 'category': a[7]}
+    if a[1] is not None:
+        alarm['object'] = a[1]
+    if a[4] is not None:
+        alarm['externalAlarmCodeId'] = a[4]
+    if a[5] is not None:
+        alarm['externalNtsAlarmCodeId'] = to_integer(a[5])
+    if rv:
+        alarm['arguments'] = rv
+    return (a[0], a[2], alarm, a[1])
+
+def status_row(cells):
+    object_type = cells.get(0, "")
+    object = cells.get(1, "")
+    sci = cells.get(2)
+    desc = cells.get(3, "")
+
+    arguments = {}
+    x = 4
+    while cells.get(x) is not None and not empty(cells[x]):
+        comment = cells.get(x + 3)
+        if comment is None or empty(comment):
+            raise ValueError("comment field for " + to_s(cells[x]) + " in " +
+                             to_s(object_type) + " " + to_s(sci) + " is empty")
+        name = re.sub(r"\s", "", to_s(cells[x]))
+        arguments[name] = {'type': cells.get(x + 1), 'description': chomp(comment)}
+        if arguments[name]['type'] not in ('boolean', 'array'):
+            add_values(arguments[name], cells.get(x + 2))
+        if arguments[name]['type'] == 'array':
+            arguments[name]['items'] = sxl_yaml.load(cells.get(x + 2) or "")
+        remove_empty_description(arguments[name])
+        x += 4
+
+    return (object_type, sci, {'description': desc, 'arguments': arguments}, object)
+
+def command_row(cells):
+    arguments = {}
+    command = None
+    x = 4
+    while cells.get(x) is not None:
+        name = chomp(cells[x])
+        arguments[name] = {'type': cells.get(x + 2), 'description': chomp(cells.get(x + 4))}
+        if arguments[name]['type'] != 'boolean':
+            add_values(arguments[name], cells.get(x + 3))
+        remove_empty_description(arguments[name])
+        command = cells.get(x + 1)
+        x += 5
+
+    return (cells.get(0, ""), cells.get(2),
+            {'description': cells.get(3, ""), 'arguments': arguments, 'command': command},
+            cells.get(1, ""))
+
+def aggregated_status_row(cells):
+    return [cells.get(x) for x in range(5)]
+
+# Read a sheet, returning what it contains for the sxl and site yaml.
+# Rows are read one at a time by the readers of the sheet
+def read_sheet(name, path):
+    if name == "Version":
+        fields = {}
+        for y, cells in workbook.rows(path):
+            if y > 25:
+                break
+            fields[y] = cells
+        return fields
+
+    readers = []
+    if name == "Object types":
+        readers = [TitledSection(["Grouped objects", "Grouped object types"], get_object),
+                   TitledSection(["Single objects", "Single object types"], get_object)]
+    elif name in ("Aggregated status", "Aggregerad status"):
+        readers = [Section(6, aggregated_status_row)]
+        states = {}
+    elif name == "Alarms":
+        readers = [Section(6, alarm_row)]
+    elif name == "Status":
+        readers = [Section(6, status_row)]
+    elif name == "Commands":
+        readers = []
+    else:
+        readers = [TitledSection(["Grouped objects", "Grouped object types"], get_object),
+                   TitledSection(["Single objects", "Single object types"], get_object)]
+        site = {}
+
+    for y, cells in workbook.rows(path):
+        for reader in readers:
+            reader.row(y, cells)
+        if name == "Commands" and y >= 4 and cells.get(0) in COMMAND_SECTIONS:
+            readers.append(Section(y + 2, command_row))
+        elif name in ("Aggregated status", "Aggregerad status") and 16 <= y < 24:
+            states[y - 15] = cells
+        elif name not in SHEETS and y == 1:
+            site = cells
+
+    if name == "Object types":
+        return [object_section(reader.records()) for reader in readers]
+    if name in ("Aggregated status", "Aggregerad status"):
+        state = {}
+        for bit in range(1, 9):
+            cells = states.get(bit, {})
+            state[bit] = {'title': cells.get(1)}
+            if cells.get(2) is not None and cells.get(2) is not False:
+                state[bit]['description'] = cells[2]
+        return state, readers[0].records
+    if name in ("Alarms", "Status", "Commands"):
+        return [record for reader in readers for record in reader.records]
+    return (site.get(1), site.get(2), [object_section(reader.records()) for reader in readers])
+
+workbook = None
+
+# The workbook is given as a path or as the bytes of the file
+def init_worker(file):
+    global workbook
+    if type(file) is bytes:
+        file = io.BytesIO(file)
+    workbook = Workbook(file)
+
+def read_sheet_args(sheet):
+    return read_sheet(*sheet)
+
+# add signal (alarm, status or command) to the sxl structure
+def add_signal(dest, object_type, signal_type, signal_code, body):
+    if dest.get(object_type) is not None:
+        dest[object_type].setdefault(signal_type, {})[signal_code] = body
+    else:
+        print("Object " + to_s(signal_code) + " not found", file=sys.stderr)
+
+# add the optional field 'object' to site structure
+def add_object(site_yaml, object_type, signal_type, signal_code, value):
+    objects = site_yaml.setdefault('objects', {})
+    objects.setdefault(object_type, {}).setdefault(signal_type, {})[signal_code] = {'object': value}
+
+def add_signals(sxl, site_yaml, signal_type, records):
+    for object_type, code, body, object in records:
+        add_signal(sxl.setdefault('objects', {}), object_type, signal_type, code, body)
+        if object and not empty(object):
+            add_object(site_yaml, object_type, signal_type, code, object)
+
+# Put the sheets together into the sxl and site yaml, in the order of
+# the sheets
+def build(results):
+    sxl = {}
+    site_yaml = {}
+    sites = {}
+    for (name, path), result in results:
+        if name == "Version":
+            def cell(y, x):
+                return result.get(y, {}).get(x)
+            if 3 in result:
+                site_yaml['id'] = cell(3, 1)
+            site_yaml['version'] = cell(20, 1)
+            site_yaml['date'] = cell(20, 2)
+            site_yaml['description'] = cell(5, 1)
+            if 9 in result:
+                site_yaml['constructor'] = cell(9, 1)
+            if cell(11, 1) is not None and cell(11, 1) is not False:
+                site_yaml['reviewed'] = cell(11, 1)
+            if 1 in result.get(14, {}):
+                site_yaml['approved'] = cell(14, 1)
+            if 17 in result:
+                site_yaml['created-date'] = cell(17, 1)
+            if 25 in result:
+                site_yaml['rsmp-version'] = cell(25, 1)
+        elif name == "Object types":
+            grouped, single = result
+            sxl['objects'] = grouped
+            sxl['objects'].update(single)
+        elif name in ("Aggregated status", "Aggregerad status"):
+            state, records = result
+            objects = sxl.setdefault('objects', {})
+            for agg in records:
+                if objects.get(agg[0]) is None:
+                    print("Object " + to_s(agg[0]) + " not found", file=sys.stderr)
+                    continue
+                objects[agg[0]]['aggregated_status'] = state
+                for x, key in [(2, 'functional_position'), (3, 'functional_state')]:
+                    if type(agg[x]) is str and agg[x].startswith("-"):
+                        objects[agg[0]][key] = [field.replace("-", "")
+                                                for field in split(agg[x], "\n")]
+                objects[agg[0]]['aggregated_status_description'] = agg[4]
+        elif name == "Alarms":
+            add_signals(sxl, site_yaml, 'alarms', result)
+        elif name == "Status":
+            add_signals(sxl, site_yaml, 'statuses', result)
+        elif name == "Commands":
+            add_signals(sxl, site_yaml, 'commands', result)
+        else:
+            siteid, description, (grouped, single) = result
+            objects = grouped
+            objects.update(single)
+            if siteid in sites:
+                print("Warning: " + to_s(siteid) + " already defined", file=sys.stderr)
+            sites[siteid] = {'description': description, 'objects': objects}
+    site_yaml['sites'] = sites
+    return sxl, site_yaml
+
+# Read the sheets of a workbook given as a path or bytes. Sheets are read
+# by a pool of worker processes if workers is more than 1
+def read_workbook(file, workers=1):
+    init_worker(file)
+    sheets = workbook.sheets
+    workers = min(workers, len(sheets))
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=init_worker,
+                                 initargs=(file,)) as executor:
+            results = list(executor.map(read_sheet_args, sheets))
+    else:
+        results = [read_sheet(name, path) for name, path in sheets]
+    return build(zip(sheets, results))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Reads SXL in Excel format and outputs ' +
+        'to yaml format')
+    parser.add_argument('xlsx', nargs='?',
+        help='SXL in Excel format, instead of reading from stdin')
+    parser.add_argument('-o', '--sxl', action='store_true',
+        help='Output signal exchange list (SXL). The default without --site')
+    parser.add_argument('-s', '--site', action='store_true',
+        help='Output site configuration')
+    parser.add_argument('--workers', type=int,
+        help='Number of processes reading sheets (default: number of CPUs)')
+    args = parser.parse_args()
+
+    file = args.xlsx
+    if file is None:
+        file = sys.stdin.buffer.read()
+
+    try:
+        sxl, site_yaml = read_workbook(file, args.workers or os.cpu_count() or 1)
+    except (OSError, zipfile.BadZipFile, ET.ParseError, KeyError, ValueError) as e:
+        print("Error: " + str(e), file=sys.stderr)
+        sys.exit(1)
+
+    if args.sxl or not args.site:
+        sxl_yaml.dump(sxl, sys.stdout)
+    if args.site:
+        sxl_yaml.dump(site_yaml, sys.stdout)
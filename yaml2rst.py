@@ -1,507 +1,1161 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+# Only modules needed to parse the command line are imported here, so
+# --help and argument errors are quick. The others, yaml and pandoc among
+# them, are imported by the functions using them, when first called
+
+import os
 import sys
 import argparse
-import pypandoc
-import yaml
-from yaml.resolver import Resolver
-import re
-from tabulate import tabulate
-
-# Prevent PyYAML from converting On/Off/Yes/No into True/False
-# remove resolver entries for On/Off/Yes/No
-for ch in "OoYyNn":
-    if len(Resolver.yaml_implicit_resolvers[ch]) == 1:
-        del Resolver.yaml_implicit_resolvers[ch]
+import json
+import time
+import io
+import threading
+import collections
+import signal
+import sxl_text
+
+# Lines of a part of the document
+class Fragment:
+    def __init__(self):
+        self.buffer = []
+
+    def line(self, text=""):
+        self.buffer.append(text)
+
+    # Write each line of text, indented
+    def lines(self, text, indent):
+        for line in text.splitlines():
+            self.line(indent + line)
+
+# Output of the document.
+# Lines are collected in a large buffer before they are written to stdout,
+# to a file given by path, or to an open binary or text file. A file given
+# by path is written under a temporary name and renamed when complete, so
+# nobody can read a half-written file
+class Writer(Fragment):
+    def __init__(self, path=None, compress=False, buffer_size=1024*1024, file=None):
+        self.path = path
+        self.tmp = None
+        if file:
+            self.file = file
+        elif path:
+            import atomic_write
+            self.file, self.tmp = atomic_write.create(path)
+        else:
+            sys.stdout.flush()
+            self.file = sys.stdout.buffer
+        self.stream = self.file
+        if compress:
+            import gzip
+            self.stream = gzip.GzipFile(filename='', mode='wb', fileobj=self.file, mtime=0)
+        self.text = isinstance(self.stream, io.TextIOBase)
+        self.buffer = []
+        self.buffered = 0
+        self.buffer_size = buffer_size
+
+    def line(self, text=""):
+        self.buffer.append(text)
+        self.buffered += len(text) + 1
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    # Write the lines of a fragment
+    def fragment(self, lines):
+        for line in lines:
+            self.line(line)
+
+    def flush(self):
+        if self.buffer:
+            self.buffer.append("")
+            text = "\n".join(self.buffer)
+            self.stream.write(text if self.text else text.encode('utf-8'))
+            self.buffer = []
+            self.buffered = 0
+
+    # Write everything and move the file into place
+    def close(self):
+        self.flush()
+        if self.stream is not self.file:
+            self.stream.close()
+        self.file.flush()
+        if self.tmp:
+            import atomic_write
+            os.fsync(self.file.fileno())
+            self.file.close()
+            atomic_write.replace(self.tmp, self.path)
+
+    # Throw away a partially written file
+    def abort(self):
+        if self.tmp:
+            self.file.close()
+            os.unlink(self.tmp)
+
+# Timings of a run, for --profile. Only created when profiling, so a
+# normal run doesn't time or count anything
+class Profile:
+    # Methods of the rst renderer and functions of sxl_text whose calls
+    # are counted and timed
+    METHODS = ["print_table", "start_table", "comment", "argument"]
+    FUNCTIONS = ["trim", "paragraphs", "summary", "sort_cid"]
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.current = None
+        self.since = self.started
+        self.phases = {}
+        self.calls = {}
+        self.codes = {}
+
+        # The functions replaced by wrap(), and the depth of the calls of
+        # each being timed
+        self.wrapped = []
+        self.depth = {}
+
+        # Conversions recorded by the converter
+        self.descriptions = []
+
+    # Start a phase, ending the current one
+    def phase(self, name):
+        now = time.perf_counter()
+        if self.current:
+            self.phases[self.current] = self.phases.get(self.current, 0) + now - self.since
+        self.current = name
+        self.since = now
+
+    def count(self, counts, name, seconds):
+        count = counts.setdefault(name, [0, 0])
+        count[0] += 1
+        count[1] += seconds
+
+    # Replace the functions by wrappers counting calls and time. Only the
+    # outermost of nested calls, like the arguments of array items, is
+    # timed, so no time is counted twice
+    def wrap(self):
+        import sxl_formats
+        for owner, names in [(sxl_formats.Rst, self.METHODS), (sxl_text, self.FUNCTIONS)]:
+            for name in names:
+                function = getattr(owner, name)
+                def wrapper(*args, function=function, name=name, **kwargs):
+                    if self.depth.get(name):
+                        self.count(self.calls, name, 0)
+                        return function(*args, **kwargs)
+                    self.depth[name] = 1
+                    start = time.perf_counter()
+                    try:
+                        return function(*args, **kwargs)
+                    finally:
+                        self.depth[name] = 0
+                        self.count(self.calls, name, time.perf_counter() - start)
+                wrapper.__name__ = name
+                setattr(owner, name, wrapper)
+                self.wrapped.append((owner, name, function))
+
+    # Put back the functions replaced by wrap()
+    def unwrap(self):
+        for owner, name, function in self.wrapped:
+            setattr(owner, name, function)
+        self.wrapped = []
+
+    # Render a part of the document, timed by code id
+    # for the details of alarms, statuses and commands
+    def render_part(self, printer, args, rendering):
+        start = time.perf_counter()
+        lines = render_part(printer, args, rendering)
+        name = args[0]
+        if name == 'details':
+            name = args[2].id
+        self.count(self.codes, name, time.perf_counter() - start)
+        return lines
+
+    def report(self, slowest=10):
+        self.phase(None)
+        total = time.perf_counter() - self.started
+
+        def counts(counts):
+            return {name: {'calls': calls, 'seconds': seconds} for name,(calls,seconds) in
+                    sorted(counts.items(), key=lambda item: item[1][1], reverse=True)}
+
+        descriptions = sorted(self.descriptions, key=lambda d: d[1], reverse=True)
+        return {
+            'total_seconds': total,
+            'phases': self.phases,
+            'calls': counts(self.calls),
+            'codes': counts(self.codes),
+            'slowest_descriptions': [{
+                'description': text.split("\n")[0][:80],
+                'seconds': seconds,
+                'converter': method,
+                'batch': size} for text,seconds,method,size in descriptions[:slowest]]}
+
+def phase(profile, name):
+    if profile:
+        profile.phase(name)
+
+# Render a part of the document
+def render_part(printer, args, rendering):
+    fragment = Fragment()
+    printer(fragment, rendering, *args)
+    return fragment.buffer
+
+# State of a worker process, set by its initializer: the Rendering whose
+# parts it renders, the Session of the files of a batch, or the
+# ServerWorker of the server. It's never set in the main process
+worker = None
+
+# Set up a worker process rendering parts of a document
+def init_worker(state):
+    global worker
+    session_state, sxl, extended, code_index = state
+    worker = Rendering(Session(*session_state), sxl, extended, code_index=code_index)
+
+def render_worker_part(printer, args):
+    return render_part(printer, args, worker)
+
+# The document, as lines printed directly and parts rendered separately.
+# The parts, e.g. the details of each alarm, don't depend on each other
+# and are rendered concurrently by a pool of processes, then joined in
+# order
+class Document(Fragment):
+    # Fewer parts are rendered faster than a pool is started
+    MIN_PARALLEL = 200
+
+    def __init__(self, rendering):
+        self.rendering = rendering
+        self.parts = [[]]
+        self.pending = []
+
+    def line(self, text=""):
+        self.parts[-1].append(text)
+
+    def fragment(self, lines):
+        self.parts.append(lines)
+        self.parts.append([])
+
+    # Add a part to be rendered by printer(out, *args)
+    def defer(self, key, printer, args):
+        self.pending.append((len(self.parts), key))
+        self.parts.append((printer, args))
+        self.parts.append([])
+
+    def render(self, workers=1):
+        jobs = [self.parts[index] for index,key in self.pending]
+        printers = [printer for printer,printer_args in jobs]
+        arguments = [printer_args for printer,printer_args in jobs]
+        renderings = [self.rendering] * len(jobs)
+        profile = self.rendering.session.profile
+        if profile:
+            results = list(map(profile.render_part, printers, arguments, renderings))
+        elif workers > 1 and len(jobs) >= self.MIN_PARALLEL:
+            from concurrent.futures import ProcessPoolExecutor
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(workers, initializer=init_worker,
+                    initargs=(self.rendering.state(),)) as executor:
+                results = list(executor.map(render_worker_part, printers, arguments,
+                                            chunksize=chunksize))
+        else:
+            results = list(map(render_part, printers, arguments, renderings))
+
+        for (index, key), lines in zip(self.pending, results):
+            self.parts[index] = lines
+            self.rendering.fragments.add(key, lines)
+        self.pending = []
+
+    def write(self, out):
+        for part in self.parts:
+            out.fragment(part)
+
+# Parts of the document rendered by the previous run, for --incremental.
+# Each part is stored under a digest of the model subtree it's rendered from,
+# so only new or modified parts are rendered again. Parts are looked up by
+# digest rather than by position, so parts moved by sorting are reused too.
+# The parts of an earlier run in the same process can be given in old
+class Fragments:
+    def __init__(self, path=None, renderer="", old=None):
+        import sxl_model
+        # Parts are stored under the digest of their subtree
+        self.key = sxl_model.digest
+        self.path = path
+        self.renderer = renderer
+        self.reuse = bool(path) or old is not None
+        self.old = {}
+        self.new = {}
+        self.rendered = 0
+        if old is not None:
+            self.old = old
+        elif path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    state = json.load(f)
+                if state['renderer'] == renderer:
+                    self.old = state['fragments']
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def cached(self, subtree):
+        return bool(self.old) and self.key(subtree) in self.old
+
+    # Write the part rendered from subtree by printer(out, *args).
+    # The part is rendered later by the document, unless it's known
+    # from the previous run
+    def render(self, out, subtree, printer, *args):
+        key = None
+        if self.reuse:
+            key = self.key(subtree)
+            lines = self.old.get(key)
+            if lines is not None:
+                self.new[key] = lines
+                out.fragment(lines)
+                return
+        out.defer(key, printer, args)
+
+    def add(self, key, lines):
+        if self.reuse:
+            self.new[key] = lines
+            self.rendered += 1
+
+    # Keep the parts used by this run for the next one
+    def save(self):
+        if self.path:
+            import atomic_write
+            atomic_write.write_text(self.path, json.dumps({
+                'renderer': self.renderer,
+                'fragments': self.new}))
+
+# Identifies this version of the scripts and pandoc, since parts rendered
+# by another version can't be reused
+def renderer_id(pandoc_only):
+    import hashlib
+    import rst_table
+    import sxl_model
+    import sxl_formats
+    from md2rst import Converter, pandoc_fingerprint, load_pypandoc
+    h = hashlib.sha256()
+    for path in [__file__, sys.modules[Converter.__module__].__file__, rst_table.__file__,
+                 sxl_model.__file__, sxl_formats.__file__, sxl_text.__file__]:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    h.update(str(pandoc_only).encode('utf-8'))
+    if load_pypandoc():
+        h.update(pandoc_fingerprint().encode('utf-8'))
+    return h.hexdigest()
+
+# The subtree of the model of the details of an alarm, status or command
+def details_subtree(rendering, code_type, object_name, code_id):
+    return (code_type, object_name, code_id, rendering.code_index[code_type][code_id])
+
+# File extensions of the output formats, written by the renderers of
+# sxl_formats
+FORMATS = {'rst': ".rst", 'markdown': ".md", 'html': ".html", 'json': ".json"}
+
+# Index alarms, statuses and commands by code id, in a single pass.
+# Maps each code id to the object types defining it and their definitions.
+# Reports code ids defined by more than one object type
+def index_codes(sxl, warn=True):
+    index = {'alarms': {}, 'statuses': {}, 'commands': {}}
+    for object in sxl.objects:
+        for code_type,codes in index.items():
+            for code in getattr(object, code_type):
+                codes.setdefault(code.id, []).append((object.name, code))
+
+    for code_type,codes in index.items():
+        for code_id,owners in codes.items():
+            if warn and len(owners) > 1:
+                print("Warning: " + code_id + " is defined by more than one object type: " +
+                      ", ".join(object_name for object_name,code in owners), file=sys.stderr)
+    return index
+
+# Collect every description converted by the details of the rst, so they
+# can be converted together up front. Details reused from the previous
+# run are skipped
+def collect_descriptions(rendering):
+    fragments = rendering.fragments
+    descriptions = []
+    for object in rendering.sxl.objects:
+        for alarm in object.alarms:
+            if fragments.cached(details_subtree(rendering, 'alarms', object.name, alarm.id)):
+                continue
+            if alarm.reserved:
+                descriptions.append(sxl_text.RESERVED)
+            else:
+                descriptions.append(alarm.description)
+        for code_type in ['statuses', 'commands']:
+            for code in getattr(object, code_type):
+                if fragments.cached(details_subtree(rendering, code_type, object.name, code.id)):
+                    continue
+                for owner_name,owner in rendering.code_index[code_type][code.id]:
+                    if not owner.reserved:
+                        descriptions.append(owner.description)
+
+    return [sxl_text.paragraphs(sxl_text.trim(description)) for description in descriptions]
+
+# Render a part of the rst, the method name of the renderer called with args
+def render_rst_part(out, rendering, name, *args):
+    import sxl_formats
+    renderer = sxl_formats.Rst(out, rendering.session.converter.convert)
+    getattr(renderer, name)(*args)
+
+# Settings and converters of the descriptions shared by the SXLs rendered
+# in a process, so descriptions converted for one SXL are reused for the
+# next. formats are the output formats. Each format other than rst whose
+# renderer converts descriptions gets a converter of its own. converted has
+# the descriptions already converted, by format
+class Session:
+    def __init__(self, formats=('rst',), jobs=None, cache=None, pandoc_only=False,
+                 profile=None, converted=None):
+        import sxl_formats
+        from md2rst import Converter
+        self.formats = list(formats)
+        self.jobs = jobs
+        self.pandoc_only = pandoc_only
+        self.profile = profile
+        self.converter = Converter(jobs, cache, not pandoc_only)
+        self.converters = {}
+        for format in self.formats:
+            if format != 'rst' and sxl_formats.RENDERERS[format].TARGET:
+                self.converters[format] = Converter(jobs, cache, False,
+                                                    sxl_formats.RENDERERS[format].TARGET)
+        if converted:
+            self.converter.converted = converted.get('rst', {})
+            for format in self.converters:
+                self.converters[format].converted = converted.get(format, {})
+        if profile:
+            self.converter.timings = profile.descriptions
+
+    # Descriptions converted so far by format, for the workers
+    def converted(self):
+        converted = {format: self.converters[format].converted for format in self.converters}
+        converted['rst'] = self.converter.converted
+        return converted
+
+    # The arguments of the session of a worker process, without the cache
+    def state(self):
+        return (self.formats, self.jobs, None, self.pandoc_only, None, self.converted())
+
+    # Convert the descriptions for the formats other than rst, before printing
+    def prefetch_formats(self, descriptions):
+        for format in self.converters:
+            self.converters[format].prefetch(descriptions)
+
+# An SXL rendered in a session: the model, its alarms, statuses and
+# commands indexed by code id, and the parts of the document kept from the
+# previous run. The parts of the rst get everything they need from here
+class Rendering:
+    def __init__(self, session, sxl, extended=False, fragments=None, code_index=None,
+                 warn=False):
+        self.session = session
+        self.sxl = sxl
+        self.extended = extended
+        self.fragments = fragments
+        if fragments is None:
+            self.fragments = Fragments()
+        self.code_index = code_index
+        if code_index is None:
+            self.code_index = index_codes(sxl, warn)
+
+    # What a worker process rendering parts of the document needs
+    def state(self):
+        return (self.session.state(), self.sxl, self.extended, self.code_index)
+
+# Render the document of an SXL, rendering its parts with a number of
+# processes
+def render_document(rendering, workers=1):
+    import sxl_formats
+    phase(rendering.session.profile, 'render')
+    document = Document(rendering)
+
+    # The parts are kept for the next run and rendered by the document
+    def part(subtree, name, args):
+        rendering.fragments.render(document, subtree, render_rst_part, name, *args)
+
+    renderer = sxl_formats.Rst(document, rendering.session.converter.convert, part)
+    renderer.write(rendering.sxl, rendering.extended)
+    document.render(workers)
+    return document
+
+def write_document(rendering, output, compress, workers=1):
+    document = render_document(rendering, workers)
+
+    phase(rendering.session.profile, 'output')
+    out = Writer(output, compress)
+    try:
+        document.write(out)
+    except BaseException:
+        out.abort()
+        raise
+    out.close()
+
+# Write an SXL by the renderer of format in sxl_formats
+def write_rendered(rendering, format, output, compress):
+    import sxl_formats
+    phase(rendering.session.profile, 'output')
+    renderer = sxl_formats.RENDERERS[format]
+    convert = lambda text: text
+    if format in rendering.session.converters:
+        convert = rendering.session.converters[format].convert
+
+    out = Writer(output, compress)
+    try:
+        renderer(out, convert).write(rendering.sxl, rendering.extended)
+    except BaseException:
+        out.abort()
+        raise
+    out.close()
+
+# Output file of a format. With several formats, the extension of the
+# output is replaced by the one of each format
+def format_output(output, format, formats):
+    if output is None or len(formats) == 1:
+        return output
+    compressed = output.endswith(".gz")
+    if compressed:
+        output = output[:-len(".gz")]
+    root, ext = os.path.splitext(output)
+    if ext in FORMATS.values():
+        output = root
+    output += FORMATS[format]
+    if compressed:
+        output += ".gz"
+    return output
+
+# Write an SXL in each format of the session
+def write_formats(rendering, output, compress, workers=1):
+    formats = rendering.session.formats
+    for format in formats:
+        if format == 'rst':
+            write_document(rendering, format_output(output, format, formats), compress, workers)
+        else:
+            write_rendered(rendering, format, format_output(output, format, formats), compress)
+
+# Render an SXL in rst. sxl is a model of sxl_model, a yaml tree, or yaml
+# in a string, bytes or stream. The rst is written to out, a binary or
+# text stream, or returned as a string if out is None. Give the same
+# session to render many SXLs, so descriptions converted for one are
+# reused for the others
+def render(sxl, extended=False, out=None, session=None, workers=1):
+    import sxl_model
+    if session is None:
+        session = Session()
+    if isinstance(sxl, dict):
+        sxl = sxl_model.build(sxl)
+    elif not isinstance(sxl, sxl_model.SXL):
+        sxl = read_sxl(sxl)
+
+    rendering = Rendering(session, sxl, extended)
+    session.converter.prefetch(collect_descriptions(rendering))
+    document = render_document(rendering, workers)
+
+    stream = out
+    if out is None:
+        stream = io.StringIO()
+    writer = Writer(file=stream)
+    document.write(writer)
+    writer.close()
+    if out is None:
+        return stream.getvalue()
+    return None
+
+# Read an SXL into the model. The yaml tree is only kept while
+# building the model
+def read_sxl(stream):
+    import sxl_yaml
+    import sxl_model
+    return sxl_model.build(sxl_yaml.load(stream))
+
+def is_xlsx(path):
+    return path.lower().endswith(".xlsx")
+
+# Read an SXL in Excel format, given as a path or bytes, into the model.
+# The sheets are read by xlsx2yaml and the model is built from them
+# directly, without writing and parsing yaml. The yaml is only written if
+# yaml_output is set.
+# The Excel format has no version codes are available from, so the SXL
+# revision of the Version sheet is used. Object types without alarms,
+# statuses or commands get empty ones
+def read_xlsx(file, yaml_output=None, workers=1):
+    import xlsx2yaml
+    import sxl_yaml
+    import sxl_model
+    yaml_sxl, site_yaml = xlsx2yaml.read_workbook(file, workers)
+    if yaml_output:
+        out = io.StringIO()
+        sxl_yaml.dump(yaml_sxl, out)
+        writer = Writer(yaml_output)
+        writer.lines(out.getvalue(), "")
+        writer.close()
+
+    from_version = site_yaml.get('version')
+    from_version = "" if from_version is None else str(from_version)
+    objects = yaml_sxl.get('objects') or {}
+    for object in objects.values():
+        for code_type in ['alarms', 'statuses', 'commands']:
+            for code in object.setdefault(code_type, {}).values():
+                code.setdefault('from_version', from_version)
+    fields = {key: value for key,value in site_yaml.items() if key != 'sites'}
+    return sxl_model.build(dict(fields, objects=objects))
+
+# Read an SXL file in yaml or Excel format into the model
+def read_file(path, yaml_output=None, workers=1):
+    if is_xlsx(path):
+        return read_xlsx(path, yaml_output, workers)
+    with open(path, 'rb') as f:
+        return read_sxl(f)
+
+def load_sxl(path, profile=None):
+    phase(profile, 'load')
+    sxl = read_file(path)
+    phase(profile, 'index')
+    return sxl
+
+def use_compression(args, output):
+    if args.gzip is not None:
+        return args.gzip
+    return output is not None and output.endswith(".gz")
+
+# Output path of an input in batch mode
+def output_path(args, input):
+    if args.output:
+        return args.output
+    name = os.path.basename(input)
+    for ext in [".yaml", ".yml", ".xlsx"]:
+        if name.endswith(ext):
+            name = name[:-len(ext)]
+    name += ".rst"
+    if args.gzip:
+        name += ".gz"
+    return os.path.join(args.output_dir or os.path.dirname(input), name)
+
+def error_message(e):
+    import sxl_yaml
+    if isinstance(e, (OSError, sxl_yaml.yaml.YAMLError)):
+        return str(e)
+    return type(e).__name__ + ": " + str(e)
+
+# Render one file of a batch.
+# Returns an error message, or None if successful
+def render_file(input, output, compress, session, extended, fragments=None):
+    try:
+        sxl = load_sxl(input, session.profile)
+        rendering = Rendering(session, sxl, extended, fragments)
+        write_formats(rendering, output, compress)
+    except Exception as e:
+        return error_message(e)
+    return None
+
+# Set up a worker process rendering files of a batch, with the
+# descriptions converted up front
+def init_batch_worker(session_state, extended):
+    global worker
+    worker = (Session(*session_state), extended)
+
+def render_batch_file(input, output, compress):
+    return render_file(input, output, compress, *worker)
+
+# Render many files across a pool of processes. The descriptions of all
+# files are converted together before rendering.
+# Returns the number of files that failed
+def batch(args, session, fragments):
+    import sxl_formats
+    profile = session.profile
+    jobs = []
+    failed = 0
+    descriptions = []
+    texts = []
+    for input in args.yaml:
+        try:
+            phase(profile, 'load')
+            sxl = read_file(input, args.yaml_output, args.workers or os.cpu_count() or 1)
+            phase(profile, 'index')
+            rendering = Rendering(session, sxl, args.extended, fragments, warn=True)
+            phase(profile, 'convert')
+            descriptions += collect_descriptions(rendering)
+            texts += sxl_formats.descriptions(sxl)
+        except Exception as e:
+            print("Error: " + input + ": " + error_message(e), file=sys.stderr)
+            failed += 1
+            continue
+        output = output_path(args, input)
+        jobs.append((input, output, use_compression(args, output)))
+
+    phase(profile, 'convert')
+    session.converter.prefetch(descriptions)
+    session.prefetch_formats(texts)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    inputs = [input for input,output,compress in jobs]
+    outputs = [output for input,output,compress in jobs]
+    compression = [compress for input,output,compress in jobs]
+    workers = min(args.workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1 and not profile:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers, initializer=init_batch_worker,
+                                 initargs=(session.state(), args.extended)) as executor:
+            errors = list(executor.map(render_batch_file, inputs, outputs, compression))
     else:
-        Resolver.yaml_implicit_resolvers[ch] = [x for x in
-                Resolver.yaml_implicit_resolvers[ch] if x[0] != 'tag:yaml.org,2002:bool']
-
-def rst_line_break_substitution():
-    print("");
-    print(".. |br| replace:: |br_html| |br_latex|")
-    print("")
-    print(".. |br_html| raw:: html")
-    print("")
-    print("   <br>")
-    print("")
-    print(".. |br_latex| raw:: latex")
-    print("")
-    print("   \\newline")
-    print("")
-
-def sort_cid(alarm):
-    return alarm[1].translate({ord(i): None for i in 'ASM\\`_'})
-
-# Process description of alarm, status and command
-# (description of each attribute/return value treated separately)
-# - Removes last dot of first line
-# - Inserts blank second line
-# - Converts any markdown to RST
-def trim_description(description):
-    return md2rst(add_blank(rm_dot(description)))
-
-# Convert markdown to restructuredText
-def md2rst(description):
-    return pypandoc.convert_text(description, 'rst', format='md')
-
-# Removes trailing "." on first line
-def rm_dot(description):
-    desc = []
-    desc = description.split("\n")
-
-    # Strip "."
-    if len(desc) > 0:
-        if desc[0].endswith("."):
-            desc[0] = desc[0].rstrip(".")
-    return '\n'.join(desc)
-
-# Adds a empty line after first line
-def add_blank(description):
-    desc = []
-    desc = description.split("\n")
-
-    # If second line is not empty, and line
-    if len(desc) > 1 and desc[1] != "":
-        desc.insert(1, "")
-
-    return '\n'.join(desc)
-
-def read_return_value(name, argument, reserved):
-    arg_type = argument['type']
-
-    array = []
-    enum = {}
-    min = ""
-    max = ""
-
-    # If the 'values' exists, use it to construct a dictionary
-    if "values" in argument:
-        if type(argument['values']) is dict:
-            for n,desc in argument['values'].items():
-                enum[n] = desc;
-
-        if type(argument['values']) is list:
-            for n in argument['values']:
-                enum[n] = "";
-
+        errors = [render_file(input, output, compress, session, args.extended, fragments)
+                  for input,output,compress in jobs]
+
+    for input, output, error in zip(inputs, outputs, errors):
+        if error:
+            print("Error: " + input + ": " + error, file=sys.stderr)
+            failed += 1
+        else:
+            print(input + ": written to " + output, file=sys.stderr)
+    return failed
+
+# Modification time and size of a file, or None if it's missing
+def file_state(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+# Render the input again for --watch, reusing the parts of the previous
+# build and the descriptions converted so far. Errors are reported and
+# the previous output is kept. Returns the contents of the file that was
+# rendered and the parts of the document to reuse next time
+def rebuild(args, session, fragments, input, output, previous):
+    import sxl_formats
+    start = time.perf_counter()
+    try:
+        with open(input, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        print("Error: " + error_message(e), file=sys.stderr)
+        return previous, fragments
+    if data == previous:
+        return previous, fragments
+
+    last = fragments
+    fragments = Fragments(args.incremental, fragments.renderer, fragments.new or fragments.old)
+    try:
+        if is_xlsx(input):
+            sxl = read_xlsx(data, args.yaml_output, args.workers or os.cpu_count() or 1)
+        else:
+            sxl = read_sxl(data)
+        rendering = Rendering(session, sxl, args.extended, fragments, warn=True)
+        session.converter.prefetch(collect_descriptions(rendering))
+        session.prefetch_formats(sxl_formats.descriptions(sxl))
+        write_formats(rendering, output, use_compression(args, output),
+                      args.workers or os.cpu_count() or 1)
+        fragments.save()
+    except Exception as e:
+        print("Error: " + input + ": " + error_message(e), file=sys.stderr)
+        return data, last
+
+    print("%s: written to %s in %.3f s, %d of %d parts rendered" % (input, output,
+          time.perf_counter() - start, fragments.rendered, len(fragments.new)), file=sys.stderr)
+    return data, fragments
+
+# Render the input each time it changes, until interrupted. The file is
+# polled, and rendered once it has stopped changing for the debounce time.
+# Returns the parts of the last document
+def watch(args, session, fragments):
+    input = args.yaml[0]
+    output = output_path(args, input)
+
+    data, fragments = rebuild(args, session, fragments, input, output, None)
+    state = file_state(input)
+    print("Watching " + input + ", press Ctrl-C to stop", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(args.poll_interval)
+            current = file_state(input)
+            if current == state:
+                continue
+
+            # Editors may write the file in several steps
+            while True:
+                time.sleep(args.debounce)
+                settled = file_state(input)
+                if settled == current:
+                    break
+                current = settled
+            state = current
+            if state is None:
+                continue
+
+            data, fragments = rebuild(args, session, fragments, input, output, data)
+            if session.converter.cache:
+                session.converter.cache.evict()
+    except KeyboardInterrupt:
+        pass
+    return fragments
+
+# Converted descriptions kept by a server worker. Beyond this, only the
+# descriptions of the latest request are kept
+MAX_CONVERTED = 100000
+
+# A worker of the server: its session, and the models of the SXLs it
+# rendered by digest of the yaml, the most recently used last
+class ServerWorker:
+    def __init__(self, worker_args, cache):
+        self.args = worker_args
+        self.session = Session(['rst'], worker_args.jobs, cache, worker_args.pandoc_only)
+        self.models = collections.OrderedDict()
+
+# Set up a worker of the server. Ctrl-C stops the server, which then
+# shuts down the workers
+def init_server_worker(worker_args, cache):
+    global worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = ServerWorker(worker_args, cache)
+
+# Render the yaml of a request to the server, in a worker process.
+# Returns the rst, an error message and the counts for the metrics:
+# if the model was reused, the number of descriptions and how many of
+# them were converted
+def render_request(data, extended):
+    models = worker.models
+    converter = worker.session.converter
+    try:
+        import hashlib
+        key = hashlib.sha256(data).digest()
+        model_hit = key in models
+        if model_hit:
+            models.move_to_end(key)
+            sxl, code_index = models[key]
+        else:
+            sxl = read_sxl(data)
+            code_index = index_codes(sxl, warn=False)
+            models[key] = (sxl, code_index)
+            if len(models) > worker.args.models:
+                models.popitem(last=False)
+
+        rendering = Rendering(worker.session, sxl, extended, code_index=code_index)
+        descriptions = set(collect_descriptions(rendering))
+        converted = len(descriptions - converter.converted.keys())
+        converter.prefetch(descriptions)
+
+        stream = io.BytesIO()
+        out = Writer(file=stream)
+        render_document(rendering).write(out)
+        out.close()
+    except Exception as e:
+        return None, error_message(e), None
+
+    if converter.cache:
+        converter.cache.evict()
+    if len(converter.converted) > MAX_CONVERTED:
+        converter.converted = {text: converter.converted[text] for text in descriptions}
+    return stream.getvalue(), None, (model_hit, len(descriptions), converted)
+
+# Counts and latencies of the requests to the server
+class ServerMetrics:
+    # Latencies of this many of the latest requests are kept
+    SAMPLES = 1000
+
+    def __init__(self, workers):
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latencies = collections.deque(maxlen=self.SAMPLES)
+        self.model_hits = 0
+        self.descriptions = 0
+        self.converted = 0
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def end(self, seconds, counts):
+        with self.lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.latencies.append(seconds)
+            if counts is None:
+                self.errors += 1
+                return
+            model_hit, descriptions, converted = counts
+            self.model_hits += model_hit
+            self.descriptions += descriptions
+            self.converted += converted
+
+    def report(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            rendered = self.requests - self.errors
+
+            def percentile(p):
+                if not latencies:
+                    return 0
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+            def rate(hits, total):
+                if not total:
+                    return 0
+                return hits / total
+
+            return {
+                'uptime_seconds': time.time() - self.started,
+                'requests': self.requests,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'queue_depth': max(0, self.in_flight - self.workers),
+                'workers': self.workers,
+                'latency_seconds': {
+                    'samples': len(latencies),
+                    'mean': sum(latencies) / len(latencies) if latencies else 0,
+                    'p50': percentile(0.5),
+                    'p95': percentile(0.95),
+                    'max': latencies[-1] if latencies else 0},
+                'model_cache': {
+                    'hits': self.model_hits,
+                    'misses': rendered - self.model_hits,
+                    'hit_rate': rate(self.model_hits, rendered)},
+                'conversion_cache': {
+                    'descriptions': self.descriptions,
+                    'converted': self.converted,
+                    'hit_rate': rate(self.descriptions - self.converted, self.descriptions)}}
+
+# Serve over HTTP on localhost, or on a Unix socket, until interrupted.
+# POST /render with the yaml returns the rst, GET /metrics the metrics
+def serve(args, cache):
+    import http.server
+    import socketserver
+    import urllib.parse
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = args.workers or os.cpu_count() or 1
+    metrics = ServerMetrics(workers)
+    executor = ProcessPoolExecutor(workers, initializer=init_server_worker,
+                                   initargs=(args, cache))
+
+    # Start the workers before the threads of the server
+    executor.submit(os.getpid).result()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if urllib.parse.urlsplit(self.path).path != "/metrics":
+                self.reply(404, "Error: no such path, use GET /metrics or POST /render\n")
+                return
+            self.reply(200, json.dumps(metrics.report(), indent=2) + "\n", "application/json")
+
+        def do_POST(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path != "/render":
+                self.reply(404, "Error: no such path, use GET /metrics or POST /render\n")
+                return
+            try:
+                data = self.rfile.read(int(self.headers['Content-Length']))
+            except (TypeError, ValueError):
+                self.reply(411, "Error: Content-Length is required\n")
+                return
+
+            extended = args.extended
+            for value in urllib.parse.parse_qs(url.query).get('extended', []):
+                extended = value.lower() in ["1", "true", "yes"]
+
+            metrics.begin()
+            start = time.perf_counter()
+            try:
+                rst, error, counts = executor.submit(render_request, data, extended).result()
+            except Exception as e:
+                rst, error, counts = None, error_message(e), None
+            metrics.end(time.perf_counter() - start, counts)
+
+            if error:
+                self.reply(400, "Error: " + error + "\n")
+            else:
+                self.reply(200, rst)
+
+        def reply(self, status, body, content_type="text/plain; charset=utf-8"):
+            if type(body) is str:
+                body = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # Requests are counted in the metrics instead
+        def log_message(self, format, *log_args):
+            pass
+
+    if args.socket:
+        class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        # Remove the socket of an earlier server
+        if os.path.exists(args.socket) and not os.path.isfile(args.socket):
+            os.unlink(args.socket)
+        server = UnixServer(args.socket, Handler)
+        address = args.socket
     else:
-        if arg_type == "array":
-            if "items" in argument:
-                for arg_name, arg in argument['items'].items():
-                    array.append(read_return_value(arg_name, arg, reserved))
-            value = ""
-        elif arg_type == "integer" or arg_type == "long" or arg_type == "float" or arg_type == "integer_as_string":
-            if "min" in argument:
-                min = argument['min']
-
-            if "max" in argument:
-                max = argument['max']
-
-    if "description" in argument:
-        comment = argument['description'].rstrip("\n")
-
-        # First line should not end with "."
-        comment = rm_dot(comment)
-
-        comment = comment.replace("\n", " |br|\n")
-
-        # Lines should never start with whitespace
-        comment = comment.replace("\n |br|", "\n|br|")
-
-        if "optional" in argument:
-            if argument['optional'] is True:
-                comment = "(Optional) " + comment
-
-        if "deprecated" in argument:
-            if argument['deprecated'] is True:
-                comment = "``Deprecated`` " + comment
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+        address = "http://127.0.0.1:" + str(server.server_address[1])
+
+    print("Serving on " + address + ", press Ctrl-C to stop", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        executor.shutdown()
+        if args.socket:
+            os.unlink(args.socket)
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert SXL in yaml or Excel format to rst format')
+    parser.add_argument('yaml', nargs='*',
+        help='SXL files in yaml format, or Excel format if ending with .xlsx, ' +
+        'to convert, instead of reading from stdin')
+    parser.add_argument('--xlsx', action='store_true',
+        help='Read an SXL in Excel format from stdin instead of yaml')
+    parser.add_argument('--yaml-output', metavar='FILE',
+        help='Also write the SXL read from Excel format to FILE in yaml')
+    parser.add_argument('--extended', action=argparse.BooleanOptionalAction)
+    parser.add_argument('--jobs', type=int,
+        help='Number of concurrent pandoc processes (default: number of CPUs)')
+    parser.add_argument('--workers', type=int,
+        help='Number of processes rendering files, or parts of a large file ' +
+        '(default: number of CPUs)')
+    parser.add_argument('--cache-dir',
+        help='Directory of the cache of converted descriptions ' +
+        '(default: ~/.cache/sxl-tools/md2rst)')
+    parser.add_argument('--cache-size', default=64, type=int,
+        help='Maximum size of the cache in MB')
+    parser.add_argument('--no-cache', action='store_true',
+        help='Do not use the cache of converted descriptions')
+    parser.add_argument('--pandoc-only', action='store_true',
+        help='Convert all descriptions with pandoc, not the built-in converter')
+    parser.add_argument('-o', '--output',
+        help='Write to file instead of stdout. The file is replaced when complete')
+    parser.add_argument('--output-dir',
+        help='Directory of the rst files when converting files ' +
+        '(default: the directory of each yaml file)')
+    parser.add_argument('--gzip', action=argparse.BooleanOptionalAction,
+        help='Compress the output with gzip (default: if the output file ends with .gz)')
+    parser.add_argument('--incremental', metavar='STATE',
+        help='Keep the rendered parts of the document in the file STATE, and only ' +
+        'render parts whose yaml has changed since the previous run')
+    parser.add_argument('--profile', action='store_true',
+        help='Report the time of each phase, code and description in json ' +
+        'on stderr. Everything is rendered in one process')
+    parser.add_argument('--profile-output', metavar='FILE',
+        help='Write the profile to FILE instead of stderr (implies --profile)')
+    parser.add_argument('--watch', action='store_true',
+        help='Keep running and render the yaml file again each time it changes. ' +
+        'Only the parts that changed are rendered again')
+    parser.add_argument('--poll-interval', default=0.5, type=float, metavar='SECONDS',
+        help='How often to check the yaml file for changes with --watch (default: 0.5)')
+    parser.add_argument('--debounce', default=0.2, type=float, metavar='SECONDS',
+        help='How long the yaml file must be unchanged before it is rendered ' +
+        'with --watch (default: 0.2)')
+    parser.add_argument('--serve', action='store_true',
+        help='Run as a server rendering the yaml posted to /render, on localhost ' +
+        'or on a Unix socket. Metrics are at /metrics')
+    parser.add_argument('--port', default=8000, type=int,
+        help='Port on localhost of the server (default: 8000)')
+    parser.add_argument('--socket', metavar='PATH',
+        help='Serve on the Unix socket PATH instead of a port')
+    parser.add_argument('--models', default=16, type=int,
+        help='Number of parsed SXLs kept by each worker of the server (default: 16)')
+    parser.add_argument('--format', action='append', choices=list(FORMATS),
+        help='Output format, may be given more than once to write several formats ' +
+        'from one run (default: rst). With several formats, the extension of the ' +
+        'output file is replaced by the one of each format')
+    args = parser.parse_args()
+    args.format = list(dict.fromkeys(args.format or ['rst']))
+
+    if args.output and len(args.yaml) > 1:
+        parser.error("--output can only be used with a single yaml file")
+    if args.incremental and len(args.yaml) > 1:
+        parser.error("--incremental can only be used with a single yaml file")
+    if args.watch and len(args.yaml) != 1:
+        parser.error("--watch needs a single yaml file")
+    if args.xlsx and (args.yaml or args.serve):
+        parser.error("--xlsx reads from stdin and can not be used with yaml files or --serve")
+    if args.yaml_output and not (args.xlsx and not args.serve or
+                                 len(args.yaml) == 1 and is_xlsx(args.yaml[0])):
+        parser.error("--yaml-output needs --xlsx or a single Excel file")
+    if args.watch and (args.profile or args.profile_output):
+        parser.error("--watch can not be used with --profile")
+    if len(args.format) > 1 and not args.output and not args.yaml:
+        parser.error("several formats need --output or yaml files")
+    if args.serve and args.format != ['rst']:
+        parser.error("--serve only renders rst")
+    if args.serve and (args.yaml or args.watch or args.output or args.incremental or
+                       args.profile or args.profile_output):
+        parser.error("--serve can not be used with yaml files, --watch, --output, " +
+                     "--incremental or --profile")
+
+    profile = None
+    if args.profile or args.profile_output:
+        profile = Profile()
+        profile.wrap()
+
+    phase(profile, 'setup')
+    import sxl_formats
+    import atomic_write
+    from md2rst import Cache
+    cache = None
+    if not args.no_cache:
+        cache = Cache(args.cache_dir, args.cache_size*1024*1024)
+
+    renderer = ""
+    if args.incremental:
+        renderer = renderer_id(args.pandoc_only)
+    fragments = Fragments(args.incremental, renderer)
+    session = Session(args.format, args.jobs, cache, args.pandoc_only, profile)
+
+    failed = 0
+    if args.serve:
+        serve(args, cache)
+    elif args.watch:
+        fragments = watch(args, session, fragments)
+    elif args.yaml:
+        failed = batch(args, session, fragments)
     else:
-        comment = ""
-
-    if reserved is True:
-        comment = "``Reserved``"
-
-    return name, arg_type, min, max, enum, comment, array
-
-def print_return_value(name, type, min, max, enum, comment, array):
-    print("")
-    print(name)
-    print("")
-    for line in comment.splitlines():
-        print('    ' + line)
-    print("")
-    argument_table = [["type", "``" + type + "``"]]
-
-    if max != "":
-        argument_table.append(["max", "``" + str(max) + "``"])
-    if min != "":
-        argument_table.append(["min", "``" + str(min) + "``"])
-
-    for line in tabulate(argument_table, tablefmt="rst").splitlines():
-        print('    ' + line)
-
-    if enum:
-        print("")
-        enum_table = [["Enum", "Description"]]
-        for name,desc in enum.items():
-            enum_table.append([name, desc])
-        for line in tabulate(enum_table, headers="firstrow", tablefmt="rst").splitlines():
-            print('    ' + line)
-
-    if(type == "array"):
-        print("")
-        array_table = [["Name", "Description"]]
-        for a in array:
-            array_table.append([a[0], a[5]])
-        for line in tabulate(array_table, headers="firstrow", tablefmt="rst").splitlines():
-            print('    ' + line)
-
-        for a in array:
-            print_return_value(name + ": " + a[0], a[1], a[2], a[3], a[4], a[5], '')
-
-def start_table(widths,label):
-    print("")
-    print(".. tabularcolumns:: ", end='')
-    for width in widths:
-        print("|\\Yl{", width, "}", sep='', end='')
-    print("|")
-    print("")
-    print(".. table:: " + label)
-    print("   :class: longtable")
-    print("")
-    print("")
-
-def print_version():
-    print("Signal Exchange List")
-    print("====================")
-    if "id" in yaml_sxl and args.extended:
-        print("+ **Plant Id**: "   + yaml_sxl['id'])
-    if "description" in yaml_sxl and args.extended:
-        print("+ **Plant Name**: " + yaml_sxl['description'])
-    if "constructor" in yaml_sxl and args.extended:
-        print("+ **Constructor**: " + yaml_sxl['constructor'])
-    if "reviewed" in yaml_sxl and args.extended:
-        print("+ **Reviewed**: " + yaml_sxl['reviewed'])
-    if "approved" in yaml_sxl and args.extended:
-        print("+ **Approved**: " + yaml_sxl['approved'])
-    if "created-date" in yaml_sxl and args.extended:
-        print("+ **Created date**: " + yaml_sxl['created-date'])
-    if "version-date" in yaml_sxl and args.extended:
-        print("+ **SXL revision**: " + yaml_sxl['version'])
-    if "date" in yaml_sxl and args.extended:
-        print("+ **Revision date**: " + yaml_sxl['date'])
-    if "rsmp_version" in yaml_sxl and args.extended:
-        print("+ **RSMP version**: " + yaml_sxl['rsmp-version'])
-
-def print_object_types():
-    print("")
-    print("Object Types")
-    print("------------")
-    print("")
-
-    print("Grouped objects")
-    print("^^^^^^^^^^^^^^^")
-    widths = ["0.30", "0.50"]
-    table_headers = ["ObjectType", "Description"]
-    start_table(widths, "Grouped objects")
-    grouped = []
-    grouped.append(table_headers)
-    # For each object
-    for object_name,object in yaml_sxl['objects'].items():
-        if "aggregated_status" in object:
-            grouped.append([object_name, object['description']])
-    for line in tabulate(grouped, headers="firstrow", tablefmt="rst").splitlines():
-        print('   ' + line)
-    print("")
-
-    print("")
-    print("Single objects")
-    print("^^^^^^^^^^^^^^")
-    widths = ["0.30", "0.50"]
-    table_headers = ["ObjectType", "Description"]
-    start_table(widths, "Single objects")
-    single = []
-    single.append(table_headers)
-    for object_name,object in yaml_sxl['objects'].items():
-        if "aggregated_status" not in object:
-            single.append([object_name, object['description']])
-    for line in tabulate(single, headers="firstrow", tablefmt="rst").splitlines():
-        print('   ' + line)
-    print("")
-
-def print_aggregated_status():
-    print("")
-    print("Aggregated status")
-    print("-----------------")
-
-    widths = ["0.20", "0.20", "0.20", "0.40"]
-    table_headers = ["ObjectType","functionalPosition","functionalState","Description"]
-    start_table(widths, "Aggregated status")
-    agg_status = []
-    agg_status.append(table_headers)
-    # For each object
-    for object_name,object in yaml_sxl['objects'].items():
-        if "aggregated_status" in object:
-
-            # Functional position
-            fP = ""
-            if "functional_position" in object and object['functional_position']:
-                fP_list = []
-                if type(object['functional_position']) is list:
-                    for pos in object['functional_position']:
-                        fP_list.append("-" + pos)
-                fP = " |br|\n".join(fP_list)
-
-            # Functional state
-            fS = ""
-            if "functional_state" in object and object['functional_state']:
-                fS_list = []
-                if type(object['functional_state']) is list:
-                    for pos in object['functional_state']:
-                        fS_list.append("-" + pos)
-                fS = " |br|\n".join(fS_list)
-
-            # Aggregated status description
-            as_desc = ""
-            if not object['functional_position']:
-                as_desc = "functionalPosition not used (set to null)"
-            if not object['functional_state']:
-                as_desc += " |br|\nfunctionalState not used (set to null)"
-
-            agg_status.append([object_name, fP, fS, as_desc])
-
-    for line in tabulate(agg_status, headers="firstrow", tablefmt="rst").splitlines():
-        print('   ' + line)
-    print("")
-
-    widths = ["0.10", "0.30", "0.60"]
-    table_headers = ["State-Bit", "Description", "Comment"]
-    start_table(widths, "State bits")
-    state_bits = []
-    state_bits.append(table_headers)
-    # For each object
-    for object_name,object in yaml_sxl['objects'].items():
-        if "aggregated_status" in object:
-            for state_id,state in object['aggregated_status'].items():
-                if "description" in state:
-                    state_bits.append([state_id, state['title'], state['description'].replace("\n", " ")])
-                else:
-                    state_bits.append([state_id, state['title'], ""])
-
-    for line in tabulate(state_bits, headers="firstrow", tablefmt="rst").splitlines():
-        print('   ' + line)
-    print("")
-
-
-def print_alarms():
-    print("")
-    print("Alarms")
-    print("------")
-
-    widths = ["0.20", "0.10", "0.50", "0.10", "0.10"]
-    table_headers = ["ObjectType","alarmCodeId","Description","Priority","Category"]
-    start_table(widths, "Alarms")
-
-    alarm_table = []
-    alarms = []
-    # For each object
-    for object_name,object in yaml_sxl['objects'].items():
-        for alarm_id,alarm in object['alarms'].items():
-            if "reserved" in alarm and alarm['reserved'] is True:
-                alarm['description'] = "``Reserved``"
-            desc = rm_dot(alarm['description'])
-            alarm_table.append([object_name, '`' + alarm_id + '`_', desc.splitlines()[0], alarm['priority'], alarm['category']])
-            alarms.append([object_name, alarm_id, desc, alarm['priority'], alarm['category'], alarm['from_version']])
-
-    # Print alarm table
-    # Sort and insert headers
-    alarm_table.sort(key=sort_cid)
-    alarm_table.insert(0, table_headers)
-    for line in tabulate(alarm_table, headers="firstrow", tablefmt="rst").splitlines():
-        print('   ' + line)
-    print("")
-
-    # Print detailed alarm info
-    # incl. return values
-    alarms.sort(key=sort_cid)
-    for object_name,alarm_id,description,priority,category,from_version in alarms:
-
-        print("")
-        print(alarm_id)
-        print("^^^^^")
-        print("")
-        print("Available from SXL version: ``" + from_version + "``")
-        print("")
-
-
-        print(trim_description(description))
-        print("")
-
-        for object_name,object in yaml_sxl['objects'].items():
-            for id,alarm in object['alarms'].items():
-                if(alarm_id == id):
-                    reserved = False
-                    if "reserved" in alarm and alarm["reserved"] is True:
-                        reserved = True
-                    if "arguments" in alarm:
-
-                        print("**Return values**")
-
-                        for argument_name, argument in alarm['arguments'].items():
-                            name, type, min, max, enum, comment, array = read_return_value(argument_name, argument, reserved)
-                            print_return_value(name, type, min, max, enum, comment, array)
-
-def print_status():
-    print("")
-    print("Status")
-    print("------")
-
-    print("")
-    print(".. raw:: latex")
-    print("")
-    print("    \\newpage")
-    print("")
-
-    widths = ["0.30", "0.10", "0.60"]
-    table_headers = ["ObjectType","statusCodeId","Description"]
-    start_table(widths, "Status")
-
-    status_table = []
-    statuses = []
-    # For each object
-    for object_name,object, in yaml_sxl['objects'].items():
-        for status_id,status in object['statuses'].items():
-            if "reserved" in status and status['reserved'] is True:
-                status['description'] = "``Reserved``"
-            desc = rm_dot(status['description'])
-            status_table.append([object_name, '`' + status_id + '`_', desc.splitlines()[0]]) 
-            statuses.append([object_name, status_id, desc, status['from_version']])
-
-    # Print status table
-    # Sort and insert headers
-    status_table.sort(key=sort_cid)
-    status_table.insert(0, table_headers)
-    for line in tabulate(status_table, headers="firstrow", tablefmt="rst").splitlines():
-        print('   ' + line)
-    print("")
-
-    # Print detailed status info
-    # incl. return values
-    statuses.sort(key=sort_cid)
-    for object_name,status_id,description,from_version in statuses:
-        print("")
-        print(status_id)
-        print("^^^^^^^^")
-        print("")
-        print("Available from SXL version: ``" + from_version + "``")
-        print("")
-
-        # Print status description
-        for object_name,object in yaml_sxl['objects'].items():
-            for id,status in object['statuses'].items():
-                if(id == status_id):
-
-                    # Don't print if reserved for future use
-                    if "reserved" in status and status['reserved'] is True:
-                        print("``Reserved``")
-                    else:
-                        print(trim_description(status['description']))
-                    print("")
-
-        return_values = []
-        array_values = {}
-        for object_name,object in yaml_sxl['objects'].items():
-            for id,status in object['statuses'].items():
-                if(status_id == id):
-                    reserved = False
-                    if "reserved" in status and status["reserved"] is True:
-                        reserved = True
-                    if "arguments" in status:
-
-                        print("**Return values**")
-
-                        for argument_name,argument in status['arguments'].items():
-                            name, type, min, max, enum, comment, array = read_return_value(argument_name, argument, reserved)
-                            print_return_value(name, type, min, max, enum, comment, array)
-
-def print_commands():
-    print("")
-    print("Commands")
-    print("--------")
-
-    widths = ["0.30", "0.15", "0.20", "0.35"]
-    table_headers = ["ObjectType","commandCodeId","Command","Description"]
-    start_table(widths, "Commands")
-
-    command_table = []
-    commands = []
-    # For each object
-    for object_name,object, in yaml_sxl['objects'].items():
-        for command_id,command in object['commands'].items():
-            if "reserved" in command and command['reserved'] is True:
-                command['description'] = "``Reserved``"
-            desc = rm_dot(command['description'])
-            command_table.append([object_name, '`' + command_id + '`_', command['command'], desc.splitlines()[0]])
-            commands.append([object_name, command_id, desc.replace("\n", " |br| "), command['from_version']])
-
-    # Print command table
-    # Sort and insert headers
-    command_table.sort(key=sort_cid)
-    command_table.insert(0, table_headers)
-    for line in tabulate(command_table, headers="firstrow", tablefmt="rst").splitlines():
-        print('   ' + line)
-    print("")
-
-    # Arguments
-    commands.sort(key=sort_cid)
-    for object_name,command_id,description,from_version in commands:
-        print("")
-        print(command_id)
-        print("^^^^^")
-        print("")
-        print("Available from SXL version: ``" + from_version + "``")
-        print("")
-
-        # Print command description
-        for object_name,object in yaml_sxl['objects'].items():
-            for id,command in object['commands'].items():
-                if(id == command_id):
-
-                    # Don't print if reserved for future use
-                    if "reserved" in command and command['reserved'] is True:
-                        print("``Reserved``")
-                    else:
-                        print(trim_description(command['description']))
-                    print("")
-
-        arguments = []
-        for object_name,object in yaml_sxl['objects'].items():
-            for id,command in object['commands'].items():
-                if(command_id == id):
-                    reserved = False
-                    if "reserved" in command and command["reserved"] is True:
-                        reserved = True
-                    if "arguments" in command:
-
-                        print("**Arguments**")
-
-                        for argument_name,argument in command['arguments'].items():
-                            name, type, min, max, enum, comment, array = read_return_value(argument_name, argument, reserved)
-                            print_return_value(name, type, min, max, enum, comment, array)
-
-parser = argparse.ArgumentParser(description='Convert SXL in yaml to rst format')
-parser.add_argument('--extended', action=argparse.BooleanOptionalAction)
-args = parser.parse_args()
-
-# Read the yaml from stdin
-yaml_sxl = yaml.safe_load(sys.stdin.read())
-
-print_version()
-print_object_types()
-print_aggregated_status()
-print_alarms()
-print_status()
-print_commands()
-rst_line_break_substitution()
+        # Read the yaml from stdin
+        # On/Off/Yes/No are kept as strings
+        phase(profile, 'load')
+        if args.xlsx:
+            sxl = read_xlsx(sys.stdin.buffer.read(), args.yaml_output,
+                            args.workers or os.cpu_count() or 1)
+        else:
+            sxl = read_sxl(sys.stdin.read())
+
+        phase(profile, 'index')
+        rendering = Rendering(session, sxl, args.extended, fragments, warn=True)
+
+        # Convert all descriptions before printing
+        phase(profile, 'convert')
+        session.converter.prefetch(collect_descriptions(rendering))
+        session.prefetch_formats(sxl_formats.descriptions(sxl))
+
+        try:
+            write_formats(rendering, args.output, use_compression(args, args.output),
+                          args.workers or os.cpu_count() or 1)
+        except OSError as e:
+            print("Error: " + str(e), file=sys.stderr)
+            sys.exit(1)
+
+    phase(profile, 'save')
+    fragments.save()
+
+    if cache:
+        cache.evict()
+
+    if profile:
+        profile.unwrap()
+        report = json.dumps(profile.report(), indent=2)
+        if args.profile_output:
+            atomic_write.write_text(args.profile_output, report + "\n")
+        else:
+            print(report, file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()